@@ -0,0 +1,271 @@
+import pickle
+import re
+import threading
+import time
+
+import config
+import sqlite_cache
+from normalize import normalize_name
+from shared_state import _connect
+
+# Every MB artist that ever came back from a search sits in the cache as part
+# of a candidate list. This indexes those artists by normalized name,
+# sort-name and alias, plus the character trigrams of each name for fuzzy
+# lookup, so step16c can find candidates without searching MB again. The
+# Spotify artist links in fetched url-rels are kept as a Spotify ID -> MBID
+# table for step16a.
+
+# kv_cache families whose values are lists of MB artist search hits.
+SOURCE_PREFIXES = ("mb_search_artist_paged_", "mb_exact_name_")
+# kv_cache family of an artist's url relations, keyed by MBID.
+URLRELS_PREFIX = "mb_artist_urlrels_"
+# Renamed whenever harvest() reads more families, so existing files re-read the cache.
+_WATERMARK = "harvested_until_v2"
+
+_SPOTIFY_ARTIST_RE = re.compile(r"(?:open\.spotify\.com/(?:intl-[\w-]+/)?artist/|spotify:artist:)([A-Za-z0-9]{22})")
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _name_keys(doc):
+    names = [doc.get("name"), doc.get("sort-name")]
+    for a in doc.get("aliases", []) or []:
+        if isinstance(a, dict):
+            names += [a.get("name"), a.get("sort-name")]
+    keys = (normalize_name(n) for n in names if n)
+    return list(dict.fromkeys(k for k in keys if k))
+
+
+def spotify_artist_ids(relations):
+    """Spotify artist IDs linked from MB relations (an artist doc's "relations")."""
+    ids = []
+    for r in relations or []:
+        url = (r.get("url") or {}).get("resource") if isinstance(r, dict) else None
+        m = _SPOTIFY_ARTIST_RE.search(url or "")
+        if m:
+            ids.append(m.group(1))
+    return list(dict.fromkeys(ids))
+
+
+class ArtistIndex:
+    """
+    MB artist docs by MBID, with their normalized names and each distinct
+    name's trigrams, and the MBIDs linked from each Spotify artist ID.
+    Adding is idempotent, so several processes may feed the same file.
+    """
+
+    def __init__(self, db_path):
+        self._conn = _connect(db_path)
+        self._lock = threading.Lock()
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS artists (
+                mbid TEXT PRIMARY KEY,
+                doc BLOB NOT NULL,
+                n_aliases INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS names (
+                key TEXT PRIMARY KEY,
+                grams INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS name_artists (
+                key TEXT NOT NULL,
+                mbid TEXT NOT NULL,
+                PRIMARY KEY (key, mbid)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS trigrams (
+                gram TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (gram, key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS spotify_links (
+                spotify_id TEXT NOT NULL,
+                mbid TEXT NOT NULL,
+                name TEXT NOT NULL,
+                PRIMARY KEY (spotify_id, mbid)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (
+                k TEXT PRIMARY KEY,
+                v TEXT
+            );
+            """
+        )
+
+    def _tx(self, fn):
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE;")
+            try:
+                out = fn(cur)
+                cur.execute("COMMIT;")
+                return out
+            except Exception:
+                cur.execute("ROLLBACK;")
+                raise
+
+    def add(self, docs):
+        """Indexes MB artist docs (search hits). Returns how many had an MBID."""
+        now = time.time()
+        artists, links, names = [], [], {}
+        for doc in docs or []:
+            if not isinstance(doc, dict) or not doc.get("id"):
+                continue
+            # The search score belongs to the query that found the artist.
+            doc = {k: v for k, v in doc.items() if k != "score"}
+            blob = pickle.dumps(doc, protocol=pickle.HIGHEST_PROTOCOL)
+            artists.append((doc["id"], blob, len(doc.get("aliases") or []), now))
+            for key in _name_keys(doc):
+                links.append((key, doc["id"]))
+                names[key] = None
+        if not artists:
+            return 0
+
+        def _do(cur):
+            # A hit listing fewer aliases never replaces a fuller one.
+            cur.executemany(
+                "INSERT INTO artists(mbid, doc, n_aliases, updated_at) VALUES(?,?,?,?) "
+                "ON CONFLICT(mbid) DO UPDATE SET doc=excluded.doc, n_aliases=excluded.n_aliases, "
+                "updated_at=excluded.updated_at WHERE excluded.n_aliases >= artists.n_aliases;",
+                artists,
+            )
+            cur.executemany("INSERT OR IGNORE INTO name_artists(key, mbid) VALUES(?,?);", links)
+            new = []
+            for key in names:
+                cur.execute("SELECT 1 FROM names WHERE key = ?;", (key,))
+                if cur.fetchone() is None:
+                    new.append(key)
+            if new:
+                cur.executemany("INSERT INTO names(key, grams) VALUES(?,?);", [(k, len(trigrams(k))) for k in new])
+                cur.executemany(
+                    "INSERT OR IGNORE INTO trigrams(gram, key) VALUES(?,?);",
+                    [(g, k) for k in new for g in trigrams(k)],
+                )
+
+        self._tx(_do)
+        return len(artists)
+
+    def add_spotify_links(self, mbid, relations, name=None):
+        """Records the Spotify artist links among an MB artist's relations. Returns how many."""
+        if not mbid:
+            return 0
+        return self._add_links([(sid, mbid, name or "") for sid in spotify_artist_ids(relations)])
+
+    def _add_links(self, rows):
+        if not rows:
+            return 0
+        self._tx(
+            lambda cur: cur.executemany(
+                "INSERT INTO spotify_links(spotify_id, mbid, name) VALUES(?,?,?) "
+                "ON CONFLICT(spotify_id, mbid) DO UPDATE SET name=excluded.name WHERE excluded.name != '';",
+                rows,
+            )
+        )
+        return len(rows)
+
+    def spotify_mbids(self, spotify_id):
+        """[{"mbid", "name"}] of the MB artists known to link this Spotify artist ID."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT mbid, name FROM spotify_links WHERE spotify_id = ? ORDER BY mbid;", (spotify_id,)
+            ).fetchall()
+        return [{"mbid": mbid, "name": name} for mbid, name in rows]
+
+    def harvest(self):
+        """
+        Indexes the artist search hits and url relations cached since the last
+        harvest. Returns the number of artist docs.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT v FROM meta WHERE k = ?;", (_WATERMARK,)).fetchone()
+        since = float(row[0]) if row else 0.0
+        newest, docs = since, []
+        for prefix in SOURCE_PREFIXES:
+            for _key, hits, updated_at in sqlite_cache.scan(prefix, since=since):
+                docs.extend(hits or [])
+                newest = max(newest, updated_at or 0.0)
+        n = self.add(docs)
+        links = []
+        for key, rels, updated_at in sqlite_cache.scan(URLRELS_PREFIX, since=since):
+            links += [(sid, key[len(URLRELS_PREFIX):], "") for sid in spotify_artist_ids(rels)]
+            newest = max(newest, updated_at or 0.0)
+        self._add_links(links)
+        if newest > since:
+            self._tx(
+                lambda cur: cur.execute(
+                    "INSERT INTO meta(k, v) VALUES(?, ?) ON CONFLICT(k) DO UPDATE SET v=excluded.v;",
+                    (_WATERMARK, repr(newest)),
+                )
+            )
+        return n
+
+    def lookup(self, name, limit=25, min_similarity=None):
+        """
+        Indexed artist docs whose name, sort-name or an alias is trigram-similar
+        to `name`, best first. Each doc's "score" is that similarity on MB's
+        0-100 search scale (100 for an exact normalized match).
+        """
+        key = normalize_name(name)
+        if not key:
+            return []
+        if min_similarity is None:
+            min_similarity = config.ARTIST_INDEX_MIN_SIMILARITY
+        grams = sorted(trigrams(key))
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT t.key, COUNT(*), n.grams FROM trigrams t JOIN names n ON n.key = t.key "
+                f"WHERE t.gram IN ({','.join('?' * len(grams))}) GROUP BY t.key;",
+                grams,
+            ).fetchall()
+
+            sims = {}
+            for k, shared, n in rows:
+                sim = 1.0 if k == key else shared / float(len(grams) + n - shared)
+                if sim >= min_similarity:
+                    sims[k] = sim
+            best = {}
+            for k, sim in sims.items():
+                for (mbid,) in self._conn.execute("SELECT mbid FROM name_artists WHERE key = ?;", (k,)):
+                    if sim > best.get(mbid, 0.0):
+                        best[mbid] = sim
+
+            out = []
+            for mbid, sim in sorted(best.items(), key=lambda x: (-x[1], x[0]))[:limit]:
+                row = self._conn.execute("SELECT doc FROM artists WHERE mbid = ?;", (mbid,)).fetchone()
+                if row:
+                    doc = pickle.loads(row[0])
+                    doc["score"] = int(round(100 * sim))
+                    out.append(doc)
+        return out
+
+    def stats(self):
+        with self._lock:
+            return {
+                t: self._conn.execute(f"SELECT COUNT(*) FROM {t};").fetchone()[0]
+                for t in ("artists", "names", "trigrams", "spotify_links")
+            }
+
+
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_index():
+    """
+    The process-wide index over ARTIST_INDEX_FILE, brought up to date with the
+    cache on first use, or None when ARTIST_INDEX_FILE is None.
+    """
+    global _INDEX
+    if not config.ARTIST_INDEX_FILE:
+        return None
+    if _INDEX is None:
+        with _INDEX_LOCK:
+            if _INDEX is None:
+                idx = ArtistIndex(config.resolve_path(config.ARTIST_INDEX_FILE))
+                idx.harvest()
+                _INDEX = idx
+    return _INDEX
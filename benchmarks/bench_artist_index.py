@@ -0,0 +1,134 @@
+"""
+Benchmark for the local artist index (artist_index.py) over the artist
+searches recorded in the SQLite cache.
+
+For every cached search (first page) the index is asked for the same name:
+how often it returns a candidate that passes step16c's name gate, whether
+the best gate-passing MB hit is among those, and how long a lookup takes
+next to MB_MIN_INTERVAL_SECONDS per MB request. The index is built from a
+copy of the cache in a temp dir, once from all searches and once without
+the search being asked (leave-one-out), which is the case that matters:
+a name never searched before.
+
+It also compares the Spotify ID -> MBID links harvested from cached url
+relations with the cached step16a /ws/2/url answers: how many empty
+answers the links fill in, and whether non-empty ones agree.
+
+    python benchmarks/bench_artist_index.py
+    python benchmarks/bench_artist_index.py --db path/to/musicbrainz_sqlite_cache.db
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+sys.path.insert(0, REPO)
+
+PREFIX = "mb_search_artist_paged_"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--db", default=os.path.join(REPO, "musicbrainz_sqlite_cache.db"))
+    ap.add_argument("--sample", type=int, default=50, help="searches evaluated leave-one-out")
+    args = ap.parse_args(argv)
+
+    work = tempfile.mkdtemp(prefix="bench_artist_index_")
+    try:
+        # Work on a copy: opening the live WAL database could checkpoint it.
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                shutil.copy2(args.db + suffix, os.path.join(work, "cache.db" + suffix))
+
+        import config
+
+        config.DB_FILE = os.path.join(work, "cache.db")
+        config.ARTIST_INDEX_FILE = None
+        config.NLP_PROCESS_WORKERS = 0
+        import artist_index
+        import get_mbid_country as g
+        import sqlite_cache
+
+        searches = []
+        for key, hits, _ in sqlite_cache.scan(PREFIX):
+            q, _, rest = key[len(PREFIX):].partition("_")
+            if rest.endswith("_0") and hits:
+                searches.append((q, hits))
+        if not searches:
+            print(f"No cached artist searches in {args.db}")
+            raise SystemExit(1)
+
+        t0 = time.perf_counter()
+        full = artist_index.ArtistIndex(os.path.join(work, "full.db"))
+        full.harvest()
+        t_build = time.perf_counter() - t0
+        stats = full.stats()
+        print(f"{len(searches)} cached searches; index: {stats['artists']} artists, {stats['names']} names")
+        print(f"harvest from cache: {t_build * 1000:.0f} ms")
+
+        def _gate_ok(q, docs):
+            return [c.mbid for c in map(g.MBCandidate, docs) if c.mbid and g._name_sanity_gate(q, c)[0]]
+
+        def _evaluate(index_for, picks):
+            decided = agree = 0
+            seconds = 0.0
+            for i in picks:
+                q, hits = searches[i]
+                idx = index_for(i)
+                t0 = time.perf_counter()
+                local = _gate_ok(q, idx.lookup(q))
+                seconds += time.perf_counter() - t0
+                mb = _gate_ok(q, hits)
+                if local:
+                    decided += 1
+                    if mb and mb[0] in local:
+                        agree += 1
+            return len(picks), decided, agree, seconds / len(picks)
+
+        rows = [("all searches indexed", _evaluate(lambda i: full, range(len(searches))))]
+
+        # Leave-one-out: an index over every other cached search.
+        loo = {}
+
+        def _without(i):
+            if i not in loo:
+                loo.clear()
+                path = os.path.join(work, f"loo_{i}.db")
+                idx = artist_index.ArtistIndex(path)
+                idx.add([d for j, (_q, hits) in enumerate(searches) if j != i for d in hits])
+                loo[i] = idx
+            return loo[i]
+
+        picks = range(0, len(searches), max(1, len(searches) // args.sample))[: args.sample]
+        rows.append(("this search left out", _evaluate(_without, picks)))
+
+        print(f"\n{'index':<24} {'searches':>9} {'gate-passing':>13} {'MB best found':>14} {'ms/lookup':>10}")
+        for label, (n, decided, agree, per) in rows:
+            print(f"{label:<24} {n:>9} {decided:>13} {agree:>14} {per * 1000:>10.2f}")
+        print(f"\none MB search request: >= {config.MB_MIN_INTERVAL_SECONDS * 1000:.0f} ms (rate limit)")
+
+        answered = filled = agree = differ = 0
+        for key, mbids, _ in sqlite_cache.scan("mbid_spotify_"):
+            linked = {d["mbid"] for d in full.spotify_mbids(g.extract_spotify_artist_id(key) or "")}
+            answered += 1
+            if not mbids:
+                filled += bool(linked)
+            elif linked:
+                if linked == {d["mbid"] for d in mbids}:
+                    agree += 1
+                else:
+                    differ += 1
+        print(
+            f"\nSpotify links: {full.stats()['spotify_links']} harvested; of {answered} cached /ws/2/url "
+            f"answers, {filled} empty ones now have an MBID, {agree} agree, {differ} differ"
+        )
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmark for country_names.to_iso2 against country_converter.
+
+Checks that to_iso2 gives coco's single ISO2 match for every country name,
+code and demonym expansion, and for the disambiguations and area names in
+the SQLite cache (pycountry names coco does not match are counted apart).
+The reference runs on one shared CountryConverter; the previous wrapper's
+per-call coco.convert() is only timed on a sample, because it reloads
+coco's table on every call.
+
+The previous wrapper passed not_found=None, so coco echoed unmatched input
+and an unknown upper-case 2-letter text ("EU") came back as an ISO2 code.
+The reference here reports those as not found, as to_iso2 does.
+
+    python benchmarks/bench_country_names.py
+    python benchmarks/bench_country_names.py --db path/to/musicbrainz_sqlite_cache.db --sample 20
+"""
+import argparse
+import os
+import pickle
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+sys.path.insert(0, REPO)
+
+PREFIX = "mb_search_artist_paged_"
+
+
+def load_texts(db_path):
+    work = tempfile.mkdtemp(prefix="bench_country_names_")
+    try:
+        # Read a copy: opening the live WAL database could checkpoint it.
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                shutil.copy2(db_path + suffix, os.path.join(work, "cache.db" + suffix))
+        conn = sqlite3.connect(os.path.join(work, "cache.db"))
+        rows = conn.execute(
+            "SELECT value FROM kv_cache WHERE key >= ? AND key < ?;", (PREFIX, PREFIX + "\uffff")
+        ).fetchall()
+        conn.close()
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    texts = []
+    for (blob,) in rows:
+        for a in pickle.loads(blob) or []:
+            if a.get("disambiguation"):
+                texts.append(a["disambiguation"])
+            for k in ("area", "begin-area"):
+                if isinstance(a.get(k), dict) and a[k].get("name"):
+                    texts.append(a[k]["name"])
+    return texts
+
+
+def inputs(cc, db_path):
+    import gazetteer
+    from country_names import norp_candidates
+
+    out = []
+    for col in ("name_short", "name_official", "ISO2", "ISO3"):
+        out += [str(v) for v in cc.data[col].dropna()]
+    out += [v.lower() for v in out]
+    try:
+        import pycountry
+
+        for c in pycountry.countries:
+            out += [getattr(c, a, None) for a in ("name", "official_name", "common_name")]
+    except ImportError:
+        pass
+    for names in gazetteer.COUNTRY_TERMS.values():
+        for name in names:
+            out += norp_candidates(name.title())
+    out += load_texts(db_path)
+    out += ["EU", "Asia excluding China", "China excluding Hong Kong", "840", "usa", "Korea", "Congo"]
+    return [t for t in dict.fromkeys(out) if t]
+
+
+def reference(cc, text):
+    """The previous wrapper's answer from a shared converter, without the echo."""
+    try:
+        hits = cc.convert(names=text, to="ISO2", enforce_list=True, not_found="not found")[0]
+    except Exception:
+        return None
+    hits = [h for h in hits if isinstance(h, str) and re.fullmatch(r"[A-Z]{2}", h)]
+    return hits[0] if len(hits) == 1 else None
+
+
+def pycountry_name(text):
+    try:
+        import pycountry
+
+        return pycountry.countries.lookup(text).alpha_2
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--db", default=os.path.join(REPO, "musicbrainz_sqlite_cache.db"))
+    ap.add_argument("--sample", type=int, default=20, help="texts timed with per-call coco.convert")
+    ap.add_argument("--passes", type=int, default=10, help="timing repetitions")
+    args = ap.parse_args(argv)
+
+    import logging
+
+    import country_converter as coco
+
+    import country_names
+
+    logging.getLogger("country_converter").setLevel(logging.ERROR)
+    cc = coco.CountryConverter()
+    texts = inputs(cc, args.db)
+    print(f"{len(texts)} distinct inputs")
+
+    t0 = time.perf_counter()
+    country_names._table()
+    t_table = time.perf_counter() - t0
+
+    expected = {t: reference(cc, t) for t in texts}
+    mismatches = pycountry_only = 0
+    for t in texts:
+        got = country_names.to_iso2(t)
+        if got == expected[t]:
+            continue
+        if expected[t] is None and got == pycountry_name(t):
+            pycountry_only += 1
+            continue
+        mismatches += 1
+        if mismatches <= 10:
+            print(f"  MISMATCH {t!r}: coco={expected[t]!r} to_iso2={got!r}")
+    print("identical answers" if not mismatches else f"{mismatches} inputs differ")
+    print(f"{pycountry_only} pycountry names coco's regexes miss are resolved too")
+
+    def _per_text(fn, items, passes):
+        t0 = time.perf_counter()
+        for _ in range(passes):
+            for t in items:
+                fn(t)
+        return (time.perf_counter() - t0) / passes / len(items) * 1e6
+
+    sample = texts[:: max(1, len(texts) // args.sample)][: args.sample]
+    t_old = _per_text(lambda t: coco.convert(names=t, to="ISO2", not_found=None), sample, 1)
+    t_shared = _per_text(lambda t: reference(cc, t), texts, 1)
+    country_names._match.cache_clear()
+    t_cold = _per_text(country_names.to_iso2, texts, 1)
+    t_warm = _per_text(country_names.to_iso2, texts, args.passes)
+
+    print(f"\ntable load: {t_table * 1000:.1f} ms ({len(country_names._table().names)} names)")
+    print(f"{'resolver':<36} {'us/text':>10} {'speedup':>9}")
+    for label, t in (
+        (f"coco.convert per call ({len(sample)} texts)", t_old),
+        ("shared CountryConverter", t_shared),
+        ("to_iso2 (cold memo)", t_cold),
+        ("to_iso2 (warm memo)", t_warm),
+    ):
+        print(f"{label:<36} {t:>10.1f} {t_old / max(t, 1e-9):>8.0f}x")
+
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
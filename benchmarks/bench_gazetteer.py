@@ -0,0 +1,257 @@
+"""
+Startup, memory and lookup benchmark for the compiled gazetteer index
+against the previous geonamescache dict build (_init_geonamescache).
+
+Each startup is measured in a fresh process: wall time, Python allocations
+(tracemalloc peak) and resident-set growth. Lookups then time the country
+fast path and place lookups over the disambiguations in the SQLite cache.
+Fails if lookup_place gets any of PLACE_CASES, or the lexical text
+inference any of TEXT_CASES, wrong.
+
+    python benchmarks/bench_gazetteer.py
+    python benchmarks/bench_gazetteer.py --db path/to/musicbrainz_sqlite_cache.db --passes 20
+"""
+import argparse
+import json
+import os
+import pickle
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+sys.path.insert(0, REPO)
+
+PREFIX = "mb_search_artist_paged_"
+
+# (place phrase, expected lookup_place answer). A city name inside a longer
+# phrase must not decide it: "York" is GB, "New York" has no entry of its own.
+PLACE_CASES = (
+    ("Atlanta", "US"),
+    ("Rio de Janeiro", "BR"),
+    ("Paris", "FR"),
+    ("Paris, France", "FR"),
+    ("Paris, Texas", None),
+    ("New York", None),
+    ("Bay Area", None),
+    ("Latin America", None),
+)
+
+# (disambiguation, expected lexical inference). A place phrase beats a
+# country term, and a term used as a language names no country.
+TEXT_CASES = (
+    ("Spanish-language rapper from Miami", "US"),
+    ("English-language singer from Tokyo", "JP"),
+    ("sings in French, from Montreal", "CA"),
+    ("French-speaking Swiss singer", "CH"),
+    ("British rock band", "GB"),
+    ("rapper from Atlanta, USA", "US"),
+    ("rock band from New York", None),
+)
+
+
+# -- Previous implementation, verbatim ----------------------------------------
+
+def old_init_geonamescache():
+    import geonamescache
+
+    gc = geonamescache.GeonamesCache()
+    cities = gc.get_cities()
+    countries = gc.get_countries()
+
+    cityname_to_iso2 = {}
+    for _, c in cities.items():
+        nm = (c.get("name") or "").strip().lower()
+        cc = c.get("countrycode")
+        if nm and cc:
+            cityname_to_iso2.setdefault(nm, cc)
+
+    countryname_to_iso2 = {}
+    for iso2, c in countries.items():
+        nm = (c.get("name") or "").strip().lower()
+        if nm:
+            countryname_to_iso2[nm] = iso2
+    return cityname_to_iso2, countryname_to_iso2
+
+
+def _rss_kib():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def child(mode, idx_path, traced):
+    """
+    One startup in this (fresh) process; prints a JSON result line. Time and
+    RSS are taken untraced, the tracemalloc peak in a separate process.
+    """
+    import gazetteer
+
+    rss0 = _rss_kib()
+    if traced:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    if mode == "dict":
+        kept = old_init_geonamescache()
+    elif mode == "compile":
+        kept = gazetteer.write_index(idx_path)
+    else:
+        kept = gazetteer.GazetteerIndex.open(idx_path)
+        kept.scan(["british", "rock", "band"])
+    out = {"seconds": time.perf_counter() - t0, "rss_kib": _rss_kib() - rss0}
+    if traced:
+        out["py_peak_kib"] = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+    print(json.dumps(out))
+    return kept
+
+
+def run_child(mode, idx_path):
+    out = {}
+    for traced in (False, True):
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", mode, "--index", idx_path]
+            + (["--traced"] if traced else []),
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            return None
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        if traced:
+            out["py_peak_kib"] = r["py_peak_kib"]
+        else:
+            out.update(r)
+    return out
+
+
+def load_disambiguations(db_path):
+    work = tempfile.mkdtemp(prefix="bench_gazetteer_")
+    try:
+        # Read a copy: opening the live WAL database could checkpoint it.
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                shutil.copy2(db_path + suffix, os.path.join(work, "cache.db" + suffix))
+        conn = sqlite3.connect(os.path.join(work, "cache.db"))
+        rows = conn.execute(
+            "SELECT value FROM kv_cache WHERE key >= ? AND key < ?;", (PREFIX, PREFIX + "\uffff")
+        ).fetchall()
+        conn.close()
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    texts = []
+    for (blob,) in rows:
+        for a in pickle.loads(blob) or []:
+            if a.get("disambiguation"):
+                texts.append(a["disambiguation"])
+            for k in ("area", "begin-area"):
+                if isinstance(a.get(k), dict) and a[k].get("name"):
+                    texts.append(a[k]["name"])
+    return texts
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--db", default=os.path.join(REPO, "musicbrainz_sqlite_cache.db"))
+    ap.add_argument("--passes", type=int, default=10, help="lookup repetitions")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    ap.add_argument("--index", help=argparse.SUPPRESS)
+    ap.add_argument("--traced", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.child:
+        child(args.child, args.index, args.traced)
+        return
+
+    work = tempfile.mkdtemp(prefix="bench_gazetteer_")
+    idx_path = os.path.join(work, "gazetteer.idx")
+    try:
+        compiled = run_child("compile", idx_path)
+        loaded = run_child("load", idx_path)
+        old = run_child("dict", idx_path)
+
+        import gazetteer
+
+        idx = gazetteer.GazetteerIndex.open(idx_path)
+        print(
+            f"index: {idx.header['patterns']} patterns, {idx.header['states']} states, "
+            f"{os.path.getsize(idx_path) / 1024:.0f} KiB on disk"
+        )
+        print(f"\n{'startup':<28} {'ms':>9} {'py peak KiB':>12} {'rss KiB':>9}")
+        for label, r in (
+            ("dict build (previous)", old),
+            ("index compile (one-off)", compiled),
+            ("index load (mmap)", loaded),
+        ):
+            if r is None:
+                print(f"{label:<28} {'n/a (geonamescache not installed)' if label.startswith('dict') else 'failed'}")
+                continue
+            print(f"{label:<28} {r['seconds'] * 1000:>9.1f} {r['py_peak_kib']:>12} {r['rss_kib']:>9}")
+
+        gazetteer._INDEX = idx
+        import config
+
+        config.DB_FILE = os.path.join(work, "cache.db")
+        config.NLP_PROCESS_WORKERS = 0
+        import get_mbid_country as g
+
+        print()
+        failed = False
+        for label, fn, cases in (
+            ("lookup_place", gazetteer.lookup_place, PLACE_CASES),
+            ("lexical inference", g._infer_country_iso_lexical, TEXT_CASES),
+        ):
+            wrong = [(t, want, fn(t)) for t, want in cases]
+            wrong = [w for w in wrong if w[1] != w[2]]
+            for t, want, got in wrong:
+                print(f"  MISMATCH {label}({t!r}): {got} != {want}")
+            print(f"{label}: {len(cases) - len(wrong)}/{len(cases)} cases")
+            failed = failed or bool(wrong)
+        if failed:
+            raise SystemExit(1)
+
+        texts = load_disambiguations(args.db)
+        if not texts:
+            print(f"\nNo cached disambiguations in {args.db}")
+            return
+        print(f"\n{len(texts)} disambiguation/area texts, {len(set(texts))} distinct")
+
+        def _time(fn):
+            t0 = time.perf_counter()
+            for _ in range(args.passes):
+                for t in texts:
+                    fn(t)
+            return (time.perf_counter() - t0) / args.passes / len(texts) * 1e6
+
+        decided = sum(1 for t in texts if gazetteer.lookup_country(t))
+        print(f"fast path decides {decided} ({decided / len(texts):.0%})")
+        print(f"{'lookup':<28} {'us/text':>9}")
+        print(f"{'lookup_country':<28} {_time(gazetteer.lookup_country):>9.2f}")
+        print(f"{'lookup_place':<28} {_time(gazetteer.lookup_place):>9.2f}")
+
+        if old is not None:
+            from normalize import normalize_text_simple
+
+            cities, countries = old_init_geonamescache()
+
+            def _old_place(t):
+                key = normalize_text_simple(t)
+                return countries.get(key) or cities.get(key)
+
+            print(f"{'dict probe (previous)':<28} {_time(_old_place):>9.2f}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark for top-track language detection: the previous per-title
+detect_language_of on an all-languages lingua detector against one batched
+detect_languages_in_parallel_of call per artist on the LINGUA_LANGUAGES
+detector, over the top tracks recorded in the SQLite cache.
+
+Reports how often the primary language differs between the two detectors
+(the restricted set cannot name languages outside it).
+
+    python benchmarks/bench_language.py
+    python benchmarks/bench_language.py --artists 200 --low-accuracy
+"""
+import argparse
+import os
+import pickle
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+sys.path.insert(0, REPO)
+
+PREFIX = "spotify_tracks_detailed_"
+
+
+def load_track_names(db_path, limit):
+    """[[track name, ...] per artist] from the cached Spotify top tracks."""
+    work = tempfile.mkdtemp(prefix="bench_language_")
+    try:
+        # Read a copy: opening the live WAL database could checkpoint it.
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                shutil.copy2(db_path + suffix, os.path.join(work, "cache.db" + suffix))
+        conn = sqlite3.connect(os.path.join(work, "cache.db"))
+        rows = conn.execute(
+            "SELECT value FROM kv_cache WHERE key >= ? AND key < ? LIMIT ?;", (PREFIX, PREFIX + "\uffff", limit)
+        ).fetchall()
+        conn.close()
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    out = []
+    for (blob,) in rows:
+        names = [t.get("name") for t in pickle.loads(blob) or [] if isinstance(t, dict) and t.get("name")]
+        if names:
+            out.append(names)
+    return out
+
+
+def primary(results):
+    counts = Counter(code for code, _name, conf in results if code and conf > 0.5)
+    return counts.most_common(1)[0][0] if counts else None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--db", default=os.path.join(REPO, "musicbrainz_sqlite_cache.db"))
+    ap.add_argument("--artists", type=int, default=300, help="artists (cached top-track lists) to use")
+    ap.add_argument("--low-accuracy", action="store_true", help="LINGUA_LOW_ACCURACY for both detectors")
+    args = ap.parse_args(argv)
+
+    import config
+
+    config.NLP_PROCESS_WORKERS = 0
+    config.LINGUA_LOW_ACCURACY = args.low_accuracy
+    import get_mbid_country as g
+
+    artists = load_track_names(args.db, args.artists)
+    if not artists or not g._LINGUA_OK:
+        print("No cached top tracks, or lingua is not installed")
+        raise SystemExit(1)
+    n_titles = sum(len(a) for a in artists)
+    print(f"{len(artists)} artists, {n_titles} track titles")
+
+    def _build(languages):
+        config.LINGUA_LANGUAGES = languages
+        g._DETECTOR = None
+        t0 = time.perf_counter()
+        detector = g._get_detector()
+        return detector, time.perf_counter() - t0
+
+    restricted_langs = list(config.LINGUA_LANGUAGES or [])
+
+    # Previous path: all languages, one detect_language_of per title.
+    _det, t_build_all = _build(None)
+    t0 = time.perf_counter()
+    old = [primary([g.detect_language(t) for t in names]) for names in artists]
+    t_old = time.perf_counter() - t0
+
+    # New path: restricted set, one parallel call per artist.
+    _det, t_build = _build(restricted_langs or None)
+    t0 = time.perf_counter()
+    new = [primary(g.detect_languages(names)) for names in artists]
+    t_new = time.perf_counter() - t0
+
+    differ = sum(1 for a, b in zip(old, new) if a != b)
+    outside = sum(1 for a in old if a and restricted_langs and a not in restricted_langs)
+    print(f"restricted set: {len(restricted_langs) or 'all'} languages")
+    print(f"primary language differs for {differ} artists ({outside} detected outside the set before)")
+
+    print(f"\n{'path':<40} {'ms/artist':>10} {'speedup':>8}")
+    per = 1000.0 / len(artists)
+    for label, t in (
+        ("all languages, per title (first use)", t_old),
+        ("restricted, parallel batch (first use)", t_new),
+    ):
+        print(f"{label:<40} {t * per:>10.2f} {t_old / max(t, 1e-9):>7.1f}x")
+
+    # Steady state, models loaded.
+    _build(None)
+    [g.detect_language(t) for names in artists[:20] for t in names]
+    t0 = time.perf_counter()
+    [primary([g.detect_language(t) for t in names]) for names in artists]
+    t_old_warm = time.perf_counter() - t0
+    _build(restricted_langs or None)
+    [g.detect_languages(names) for names in artists[:20]]
+    t0 = time.perf_counter()
+    [primary(g.detect_languages(names)) for names in artists]
+    t_new_warm = time.perf_counter() - t0
+    for label, t in (
+        ("all languages, per title (loaded)", t_old_warm),
+        ("restricted, parallel batch (loaded)", t_new_warm),
+    ):
+        print(f"{label:<40} {t * per:>10.2f} {t_old_warm / max(t, 1e-9):>7.1f}x")
+    print(f"\ndetector build: all {t_build_all * 1000:.0f} ms, restricted {t_build * 1000:.0f} ms")
+    print("cached artists (track_lang_ keys) skip detection entirely")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Microbenchmark for normalize.py against the previous inline normalizers.
+
+Checks that every normalizer returns exactly what the old implementation
+returned for each artist name and track title in countries.csv (plus a few
+case/punctuation variants), then times both over repeated passes, the way
+the ladder re-normalizes the same names per candidate and per step.
+
+    python benchmarks/bench_normalize.py
+    python benchmarks/bench_normalize.py --csv countries.csv --passes 20
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+import unicodedata
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+sys.path.insert(0, REPO)
+
+import normalize  # noqa: E402
+
+
+# -- Previous implementations, verbatim ---------------------------------------
+
+def old_clean_text(text):
+    if text is None:
+        return "None"
+    if isinstance(text, float):
+        if text != text:
+            return "None"
+        return str(text)
+
+    text = str(text)
+    if not text or text.isspace():
+        return "None"
+    if text.strip().lower() in ["none", "null", "nan", "na", ""]:
+        return "None"
+
+    try:
+        text = unicodedata.normalize("NFKC", text)
+    except Exception:
+        pass
+
+    text = " ".join(text.split())
+    return text.strip()
+
+
+def old_normalize_name(s):
+    if s is None:
+        return ""
+    s = str(s)
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    s = s.lower().strip()
+    s = re.sub(r"[’'`]", "", s)
+    s = re.sub(r"[^a-z0-9\s]", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+
+def old_normalize_name_strict(s):
+    if s is None:
+        return ""
+    s = str(s)
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    s = s.lower().strip()
+    s = s.replace("＋", "+")
+    s = re.sub(r"[’'`]", "", s)
+    s = re.sub(r"[^a-z0-9+\s]", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+
+def old_tokens_strict(s):
+    s = old_normalize_name_strict(s)
+    toks = s.split()
+    mapped = []
+    for t in toks:
+        mapped.append(normalize._NUM_WORDS.get(t, t))
+    return mapped
+
+
+def old_normalize_track_title(s):
+    s = old_clean_text(s)
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    s = s.lower().strip()
+    s = re.sub(r"\(.*?\)|\[.*?\]|\{.*?\}", " ", s)
+    s = re.sub(r"\b(remaster(ed)?|live|edit|version|mono|stereo|deluxe|feat\.?|ft\.?)\b", " ", s)
+    s = re.sub(r"[’'`]", "", s)
+    s = re.sub(r"[^a-z0-9\s]", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+
+def old_normalize_text_simple(s):
+    s = str(s)
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    s = s.strip().lower()
+    s = re.sub(r"\s+", " ", s)
+    return s
+
+
+def old_token_set(s):
+    return set(old_normalize_name(s).split())
+
+
+PAIRS = [
+    ("clean_text", old_clean_text, normalize.clean_text),
+    ("normalize_name", old_normalize_name, normalize.normalize_name),
+    ("normalize_name_strict", old_normalize_name_strict, normalize.normalize_name_strict),
+    ("tokens_strict", old_tokens_strict, lambda s: list(normalize.strict_tokens(s))),
+    ("token_set", old_token_set, lambda s: set(normalize.name_tokens(s))),
+    ("track_title", old_normalize_track_title, normalize.normalize_track_title),
+    ("text_simple", old_normalize_text_simple, normalize.normalize_text_simple),
+]
+
+
+def load_strings(csv_path):
+    out = []
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            for col in ("artist_name", "track_used"):
+                v = row.get(col)
+                if v:
+                    out.append(v)
+
+    # Variants that exercise case folding, apostrophes, brackets and edge values.
+    extra = []
+    for v in out[:200]:
+        extra += [v.upper(), f"  {v}’s  ", f"{v} (Remastered 2011)", f"{v} feat. İstanbul Ｘ＋"]
+    return out + extra + [None, "", "   ", "nan", "NULL", float("nan"), 1.5, "Ｂｅｙｏｎｃé", "Ángel"]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--csv", default=os.path.join(REPO, "countries.csv"))
+    ap.add_argument("--passes", type=int, default=10, help="times each string is normalized")
+    args = ap.parse_args(argv)
+
+    strings = load_strings(args.csv)
+    print(f"{len(strings)} strings from {args.csv}")
+
+    mismatches = 0
+    for label, old, new in PAIRS:
+        for s in strings:
+            if label in ("track_title", "text_simple", "tokens_strict", "token_set") and s is None:
+                continue
+            a, b = old(s), new(s)
+            if a != b:
+                mismatches += 1
+                if mismatches <= 10:
+                    print(f"  MISMATCH {label}: {s!r}: {a!r} != {b!r}")
+    print("identical output" if not mismatches else f"{mismatches} mismatches")
+
+    # cold: one pass over distinct strings with empty memo caches (pure
+    # precompiled-pattern speed); warm: --passes repeats, as in a real run.
+    print(f"\n{'function':<24} {'old ms':>9} {'cold ms':>9} {'warm ms':>9} {'cold x':>7} {'warm x':>7}")
+    for label, old, new in PAIRS:
+        inputs = [s for s in strings if s is not None]
+
+        normalize.cache_clear()
+        t0 = time.perf_counter()
+        for s in inputs:
+            old(s)
+        t_old = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for s in inputs:
+            new(s)
+        t_cold = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for _ in range(args.passes):
+            for s in inputs:
+                old(s)
+        t_old_warm = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for _ in range(args.passes):
+            for s in inputs:
+                new(s)
+        t_warm = time.perf_counter() - t0
+
+        print(
+            f"{label:<24} {t_old * 1000:>9.1f} {t_cold * 1000:>9.1f} {t_warm / args.passes * 1000:>9.2f} "
+            f"{t_old / max(t_cold, 1e-9):>6.1f}x {t_old_warm / max(t_warm, 1e-9):>6.1f}x"
+        )
+
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Benchmark for a vectorized step16c scorer (BatchScorer, below) against
+score_mb_candidate in a loop, on MB artist-search pages recorded in the
+SQLite cache.
+
+Fails if any candidate gets a different score. "cold" includes building the
+token-ID arrays, which would happen once per candidate per search in a real
+run. MB search results stop at 100 candidates, below the break-even point
+this prints, so the resolver keeps the loop and the batch scorer lives here.
+
+    python benchmarks/bench_scoring.py
+    python benchmarks/bench_scoring.py --db path/to/musicbrainz_sqlite_cache.db --rounds 50
+"""
+import argparse
+import itertools
+import os
+import pickle
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+sys.path.insert(0, REPO)
+
+PREFIX = "mb_search_artist_paged_"
+
+
+def _column(arrays, k):
+    return np.array(list(itertools.chain.from_iterable(a[k] for a in arrays)), dtype=np.int64)
+
+
+def _in_set(ids, set_ids):
+    # set_ids is a Spotify name's handful of tokens: a broadcast compare beats np.isin.
+    return (ids[:, None] == set_ids).any(axis=1)
+
+
+def _group_counts(flags, lens):
+    """Sum of `flags` per consecutive group of sizes `lens`."""
+    owner = np.repeat(np.arange(len(lens)), lens)
+    return np.bincount(owner, weights=flags, minlength=len(lens))
+
+
+class BatchScorer:
+    """
+    score_mb_candidate for a whole search result at once: variant, alias and
+    candidate features go through NumPy in one pass over token-ID arrays.
+    Token and name strings are interned per scorer, and each MBCandidate's
+    arrays are kept until clear().
+    """
+
+    def __init__(self, g):
+        self.g = g
+        self.clear()
+
+    def clear(self):
+        self._ids = {}
+        self._arrays = {}
+
+    def _id(self, t):
+        return self._ids.setdefault(t, len(self._ids))
+
+    def _candidate_arrays(self, cand):
+        """
+        Variant name IDs, variant token IDs + counts, strict token IDs +
+        counts, alias name IDs, alias token IDs + counts.
+        """
+        hit = self._arrays.get(id(cand))
+        if hit is None or hit[0] is not cand:
+            tid = self._id
+            hit = self._arrays[id(cand)] = (
+                cand,
+                (
+                    [tid(v) for v in cand.norms],
+                    [tid(t) for ts in cand.name_tokens for t in ts],
+                    [len(ts) for ts in cand.name_tokens],
+                    [tid(t) for ts in cand.strict_sets for t in ts],
+                    [len(ts) for ts in cand.strict_sets],
+                    [tid(a) for a in cand.en_alias_norms],
+                    [tid(t) for ts in cand.en_alias_tokens for t in ts],
+                    [len(ts) for ts in cand.en_alias_tokens],
+                ),
+            )
+        return hit[1]
+
+    def score(self, spotify_meta, candidates):
+        """The scores score_mb_candidate gives, in candidate order."""
+        g = self.g
+        cands = [g._as_candidate(c) for c in candidates]
+        if not cands:
+            return []
+
+        sp_name = (spotify_meta or {}).get("name", "") or ""
+        sp_norm = g.normalize_name(sp_name)
+        if not sp_norm:
+            return [-999] * len(cands)
+
+        sp_norm_id = self._id(sp_norm)
+        sp_ids = np.array([self._id(t) for t in g.name_tokens(sp_name)], dtype=np.int64)
+        sp_strict_ids = np.array([self._id(t) for t in frozenset(g.strict_tokens(sp_name))], dtype=np.int64)
+
+        arrays = [self._candidate_arrays(c) for c in cands]
+        norm_ids, name_ids, name_lens, strict_ids, strict_lens, alias_norm_ids, alias_ids, alias_lens = (
+            _column(arrays, k) for k in range(8)
+        )
+        n = len(cands)
+        var_counts = np.array([len(a[0]) for a in arrays])
+        alias_counts = np.array([len(a[5]) for a in arrays])
+
+        # Name variants: exact (80), else int(45 * Jaccard), raised to 35 when
+        # the strict Spotify tokens are a subset of the variant's.
+        inter = _group_counts(_in_set(name_ids, sp_ids), name_lens)
+        jac = np.where(name_lens > 0, inter / np.maximum(1, name_lens + len(sp_ids) - inter), 0.0)
+        s = np.floor(45 * jac)
+        if len(sp_strict_ids):
+            hits = _group_counts(_in_set(strict_ids, sp_strict_ids), strict_lens)
+            s = np.where(hits == len(sp_strict_ids), np.maximum(s, 35), s)
+        s = np.where(norm_ids == sp_norm_id, 80, s)
+
+        best = np.zeros(n)
+        has_var = var_counts > 0
+        if len(s):
+            starts = np.cumsum(var_counts) - var_counts
+            best[has_var] = np.maximum.reduceat(s, starts[has_var])
+
+        # First primary English alias that matches exactly (+20) or by tokens (+12).
+        if len(alias_norm_ids):
+            inter = _group_counts(_in_set(alias_ids, sp_ids), alias_lens)
+            jac = np.where(alias_lens > 0, inter / np.maximum(1, alias_lens + len(sp_ids) - inter), 0.0)
+            exact = alias_norm_ids == sp_norm_id
+            bonus = np.where(exact, 20, np.where(jac >= 0.6, 12, 0))
+            order = np.where(bonus > 0, np.arange(len(bonus)), len(bonus))
+            has_alias = alias_counts > 0
+            starts = np.cumsum(alias_counts) - alias_counts
+            first = np.full(n, len(bonus))
+            first[has_alias] = np.minimum.reduceat(order, starts[has_alias])
+            hit = first < len(bonus)
+            best[hit] += bonus[first[hit]]
+
+        for c in cands:
+            if c.disamb_iso is g._NOT_INFERRED:
+                c.disamb_iso = g.infer_country_iso_from_text(c.disamb)
+        is_group = np.fromiter((c.is_group for c in cands), dtype=bool, count=n)
+        has_disamb_iso = np.fromiter((bool(c.disamb_iso) for c in cands), dtype=bool, count=n)
+        search = np.fromiter((c.search_score or 0 for c in cands), dtype=np.float64, count=n)
+        best += 5 * is_group + 5 * has_disamb_iso + np.trunc(0.1 * search)
+
+        return [int(x) for x in best]
+
+
+def load_searches(db_path):
+    """{search name: candidates of all its cached pages, in page order}."""
+    work = tempfile.mkdtemp(prefix="bench_scoring_")
+    try:
+        # Read a copy: opening the live WAL database could checkpoint it.
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                shutil.copy2(db_path + suffix, os.path.join(work, "cache.db" + suffix))
+        conn = sqlite3.connect(os.path.join(work, "cache.db"))
+        rows = conn.execute(
+            "SELECT key, value FROM kv_cache WHERE key >= ? AND key < ?;", (PREFIX, PREFIX + "\uffff")
+        ).fetchall()
+        conn.close()
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    pages = []
+    for key, blob in rows:
+        head, _limit, offset = key[len(PREFIX) :].rsplit("_", 2)
+        name = head.split("_", 1)[0]
+        pages.append((name, int(offset), pickle.loads(blob) or []))
+
+    searches = {}
+    for name, _offset, artists in sorted(pages):
+        searches.setdefault(name, []).extend(artists)
+    return {k: v for k, v in searches.items() if v}
+
+
+def spotify_names(search_name, docs):
+    names = [search_name, search_name.title(), f"The {search_name}", f"{search_name} 2"]
+    names += [d.get("name") for d in docs[:3] if d.get("name")]
+    return names
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--db", default=os.path.join(REPO, "musicbrainz_sqlite_cache.db"))
+    ap.add_argument("--rounds", type=int, default=20, help="timing repetitions")
+    ap.add_argument(
+        "--sizes",
+        type=lambda v: [int(x) for x in v.split(",") if x.strip()],
+        default=[10, 25, 50, 100, 200, 400, 800],
+        help="stitched result-set sizes for the break-even table",
+    )
+    args = ap.parse_args(argv)
+
+    import config
+
+    config.NLP_PROCESS_WORKERS = 0
+    import get_mbid_country as g
+
+    scorer = BatchScorer(g)
+    searches = load_searches(args.db)
+    if not searches:
+        print(f"No cached MB search pages in {args.db}")
+        raise SystemExit(1)
+
+    cases = []
+    for search_name, docs in searches.items():
+        for sp in spotify_names(search_name, docs):
+            cases.append(({"name": sp}, docs))
+    n_cands = sum(len(docs) for _, docs in cases)
+    print(f"{len(searches)} searches, {len(cases)} (spotify name, result) cases, {n_cands} candidates")
+
+    # Shared parsing and disambiguation inference, as in choose_best_mbid_via_search.
+    parsed = {id(docs): [g.MBCandidate(d) for d in docs] for _, docs in cases}
+    for cands in parsed.values():
+        for c in cands:
+            c.disamb_iso = g.infer_country_iso_from_text(c.disamb)
+
+    mismatches = 0
+    for meta, docs in cases:
+        cands = parsed[id(docs)]
+        loop = [g.score_mb_candidate(meta, c) for c in cands]
+        batch = scorer.score(meta, cands)
+        if loop != batch:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  MISMATCH for {meta['name']!r}: {loop} != {batch}")
+    print("identical scores" if not mismatches else f"{mismatches} cases differ")
+
+    def _time(fn):
+        t0 = time.perf_counter()
+        for _ in range(args.rounds):
+            fn()
+        return (time.perf_counter() - t0) / args.rounds
+
+    def _loop():
+        for meta, docs in cases:
+            [g.score_mb_candidate(meta, c) for c in parsed[id(docs)]]
+
+    def _batch_cold():
+        scorer.clear()
+        for meta, docs in cases:
+            scorer.score(meta, parsed[id(docs)])
+
+    def _batch_warm():
+        for meta, docs in cases:
+            scorer.score(meta, parsed[id(docs)])
+
+    t_loop = _time(_loop)
+    t_cold = _time(_batch_cold)
+    t_warm = _time(_batch_warm)
+    per = 1e6 / max(1, len(cases))
+    print(f"\n{'scorer':<22} {'ms/round':>9} {'us/search':>10} {'speedup':>8}")
+    for label, t in (("loop", t_loop), ("batch (cold arrays)", t_cold), ("batch (warm arrays)", t_warm)):
+        print(f"{label:<22} {t * 1000:>9.2f} {t * per:>10.1f} {t_loop / max(t, 1e-12):>7.2f}x")
+
+    # Larger result sets, stitched from the recorded candidates, to locate the
+    # break-even point.
+    pool = [c for cands in parsed.values() for c in cands]
+    print(f"\n{'candidates':>10} {'loop us':>9} {'batch us':>9} {'speedup':>8}")
+    for size in args.sizes:
+        cands = [pool[i % len(pool)] for i in range(size)]
+        meta = {"name": cands[0].get("name") or "x"}
+        if scorer.score(meta, cands) != [g.score_mb_candidate(meta, c) for c in cands]:
+            mismatches += 1
+        t_loop = _time(lambda: [g.score_mb_candidate(meta, c) for c in cands])
+        t_batch = _time(lambda: scorer.score(meta, cands))
+        print(f"{size:>10} {t_loop * 1e6:>9.0f} {t_batch * 1e6:>9.0f} {t_loop / max(t_batch, 1e-12):>7.2f}x")
+
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
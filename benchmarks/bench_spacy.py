@@ -0,0 +1,134 @@
+"""
+Benchmark for batched spaCy NER (_spacy_entities) against the previous
+per-text nlp(t) calls on the full pipeline, over the disambiguations and
+area names recorded in the SQLite cache.
+
+Fails if any text gets different GPE/LOC/NORP entities.
+
+    python benchmarks/bench_spacy.py
+    python benchmarks/bench_spacy.py --model en_core_web_sm --passes 3
+"""
+import argparse
+import os
+import pickle
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+sys.path.insert(0, REPO)
+
+PREFIX = "mb_search_artist_paged_"
+
+
+def load_texts(db_path):
+    work = tempfile.mkdtemp(prefix="bench_spacy_")
+    try:
+        # Read a copy: opening the live WAL database could checkpoint it.
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                shutil.copy2(db_path + suffix, os.path.join(work, "cache.db" + suffix))
+        conn = sqlite3.connect(os.path.join(work, "cache.db"))
+        rows = conn.execute(
+            "SELECT value FROM kv_cache WHERE key >= ? AND key < ?;", (PREFIX, PREFIX + "\uffff")
+        ).fetchall()
+        conn.close()
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    texts = []
+    for (blob,) in rows:
+        for a in pickle.loads(blob) or []:
+            if a.get("disambiguation"):
+                texts.append(a["disambiguation"])
+            for k in ("area", "begin-area"):
+                if isinstance(a.get(k), dict) and a[k].get("name"):
+                    texts.append(a[k]["name"])
+    return texts
+
+
+def old_entities(nlp, t):
+    """Previous inline extraction from infer_country_iso_from_text."""
+    doc = nlp(t)
+    gpe_loc, norp = [], []
+    for ent in doc.ents:
+        if ent.label_ in ("GPE", "LOC"):
+            gpe_loc.append(ent.text)
+        elif ent.label_ == "NORP":
+            norp.append(ent.text)
+    return gpe_loc, norp
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--db", default=os.path.join(REPO, "musicbrainz_sqlite_cache.db"))
+    ap.add_argument("--model", default=None, help="spaCy model name or path (default: config.SPACY_MODEL)")
+    ap.add_argument("--passes", type=int, default=3, help="timing repetitions")
+    args = ap.parse_args(argv)
+
+    import config
+
+    config.NLP_PROCESS_WORKERS = 0
+    if args.model:
+        config.SPACY_MODEL = args.model
+    import get_mbid_country as g
+
+    try:
+        import spacy
+
+        full = spacy.load(config.SPACY_MODEL)
+    except Exception as e:
+        print(f"spaCy model {config.SPACY_MODEL!r} not available: {e}")
+        raise SystemExit(1)
+    trimmed = g._get_spacy_nlp()
+
+    texts = load_texts(args.db)
+    if not texts:
+        print(f"No cached disambiguations in {args.db}")
+        raise SystemExit(1)
+    print(f"{len(texts)} texts ({len(set(texts))} distinct)")
+    print(f"full pipeline:    {full.pipe_names}")
+    print(f"trimmed pipeline: {[n for n in trimmed.pipe_names if n not in trimmed.disabled]}")
+
+    mismatches = 0
+    for t, (places, norp) in zip(texts, g._spacy_entities(texts)):
+        old_places, old_norp = old_entities(full, t)
+        if tuple(g._uniq_simple(old_places)) != places or tuple(g._uniq_simple(old_norp)) != norp:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  MISMATCH {t!r}: {(old_places, old_norp)} != {(places, norp)}")
+    print("identical entities" if not mismatches else f"{mismatches} texts differ")
+
+    def _time(fn):
+        t0 = time.perf_counter()
+        for _ in range(args.passes):
+            fn()
+        return (time.perf_counter() - t0) / args.passes / len(texts) * 1e6
+
+    def _batch_cold():
+        g._SPACY_ENTS.clear()
+        g._spacy_entities(texts)
+
+    t_old = _time(lambda: [old_entities(full, t) for t in texts])
+    t_one = _time(lambda: [trimmed(t) for t in texts])
+    t_cold = _time(_batch_cold)
+    t_warm = _time(lambda: g._spacy_entities(texts))
+
+    print(f"\n{'path':<34} {'us/text':>9} {'speedup':>8}")
+    for label, t in (
+        ("full pipeline, nlp(t) per text", t_old),
+        ("trimmed pipeline, nlp(t) per text", t_one),
+        ("trimmed, nlp.pipe (cold memo)", t_cold),
+        ("trimmed, nlp.pipe (warm memo)", t_warm),
+    ):
+        print(f"{label:<34} {t:>9.1f} {t_old / max(t, 1e-9):>7.1f}x")
+
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
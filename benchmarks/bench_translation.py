@@ -0,0 +1,127 @@
+"""
+Benchmark for artist-name translation: the previous asyncio.run() per call
+from each stage thread against the shared TranslationWorker, and the
+persistent translation cache on a second run. Uses the local stand-in
+backend (stand_ins.StandInTranslator) with a fixed per-call latency.
+
+Each artist asks for two translations (detected source, then "en"), as
+get_translated_artist_name does with TRANSLATE_EAGER_PAIR, which submits
+both to the worker at once through translate_texts.
+
+    python benchmarks/bench_translation.py
+    python benchmarks/bench_translation.py --artists 400 --threads 4 --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+sys.path.insert(0, REPO)
+sys.path.insert(0, HERE)
+
+
+def requests_for(n_artists):
+    import stand_ins
+
+    world = stand_ins.SyntheticWorld(n_artists)
+    out = []
+    for a in world.artists:
+        out.append((a["name"], "auto", "ja"))
+        out.append((a["name"], "en", "ja"))
+    return out
+
+
+def run_threads(fn, reqs, threads):
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(lambda r: fn(*r), reqs))
+    return time.perf_counter() - t0, results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--artists", type=int, default=200)
+    ap.add_argument("--threads", type=int, default=2, help="calling threads (COUNTRY_STAGE_WORKERS)")
+    ap.add_argument("--latency", type=float, default=0.02, help="stand-in seconds per translation")
+    ap.add_argument("--concurrency", type=int, default=None, help="TRANSLATE_CONCURRENCY")
+    args = ap.parse_args(argv)
+
+    import config
+    import stand_ins
+    import translation
+
+    stand_ins.StandInTranslator.latency = args.latency
+    concurrency = args.concurrency or config.TRANSLATE_CONCURRENCY
+    reqs = requests_for(args.artists)
+    print(f"{len(reqs)} translation requests, {args.threads} threads, {args.latency * 1000:.0f} ms per call")
+
+    # Previous path: a fresh event loop per call in the calling thread.
+    old_backend = stand_ins.StandInTranslator()
+    t_old, old = run_threads(
+        lambda text, src, dest: asyncio.run(old_backend.translate(text, src, dest)), reqs, args.threads
+    )
+
+    backend = stand_ins.StandInTranslator()
+    worker = translation.TranslationWorker(lambda: backend, concurrency)
+    try:
+        t_worker, new = run_threads(worker.translate, reqs, args.threads)
+        calls_threads, peak_threads = backend.calls, backend.max_in_flight
+
+        backend.calls = backend.max_in_flight = 0
+        t0 = time.perf_counter()
+        batched = worker.translate_many(reqs)
+        t_many = time.perf_counter() - t0
+        calls_many, peak_many = backend.calls, backend.max_in_flight
+    finally:
+        worker.shutdown()
+
+    if old != new or old != batched:
+        print("MISMATCH between paths")
+        raise SystemExit(1)
+
+    # End to end: translate_texts per artist on a cold cache, as
+    # get_translated_artist_name calls it with TRANSLATE_EAGER_PAIR, then
+    # translate_text per request on the same cache.
+    work = tempfile.mkdtemp(prefix="bench_translation_")
+    try:
+        config.DB_FILE = os.path.join(work, "cache.db")
+        config.TRANSLATE_BACKEND = "stand_ins:StandInTranslator"
+        config.TRANSLATE_CONCURRENCY = concurrency
+        config.NLP_PROCESS_WORKERS = 0
+        import get_mbid_country as g
+        import sqlite_cache
+
+        if not g._TRANSLATE_OK:
+            print("lingua is not installed; translate_text is disabled")
+            raise SystemExit(1)
+        pairs = list(zip(reqs[::2], reqs[1::2]))
+        t_cold, cold = run_threads(lambda a, b: g.translate_texts([a, b]), pairs, args.threads)
+        g.flush_cache()
+        sqlite_cache._MEM_CACHE.clear()
+        t_warm, warm = run_threads(g.translate_text, reqs, args.threads)
+        translation.shutdown_worker()
+        if warm != old or [t for pair in cold for t in pair] != old:
+            print("MISMATCH from the translation cache")
+            raise SystemExit(1)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    print(f"\n{'path':<38} {'s':>8} {'calls':>6} {'peak':>5} {'speedup':>8}")
+    for label, t, calls, peak in (
+        ("asyncio.run per call (previous)", t_old, len(reqs), args.threads),
+        ("worker, from calling threads", t_worker, calls_threads, peak_threads),
+        ("worker, translate_many", t_many, calls_many, peak_many),
+        ("translate_texts pair, cold", t_cold, "", ""),
+        ("translate_text, second run (cached)", t_warm, 0, 0),
+    ):
+        print(f"{label:<38} {t:>8.3f} {calls!s:>6} {peak!s:>5} {t_old / max(t, 1e-9):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Import-time regression check for the CLI.
+
+Runs `main.py map` on an existing CSV and `main.py cache stats` under
+`python -X importtime` and fails when either one loads the resolver stack
+or its own imports (everything but the map renderer) exceed the budget.
+
+    python benchmarks/check_import_time.py
+    python benchmarks/check_import_time.py --budget-ms 300 --csv countries.csv
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+MAIN = os.path.join(REPO, "main.py")
+
+# Modules only `resolve` may pull in. (requests is not listed: folium uses it.)
+FORBIDDEN = (
+    "get_mbid_country",
+    "spotify_client",
+    "spotipy",
+    "lingua",
+    "googletrans",
+    "nest_asyncio",
+    "spacy",
+    "country_converter",
+    "geonamescache",
+)
+
+# What `map` legitimately spends its import time on.
+MAP_RENDERER = ("get_map",)
+
+
+def _import_times(stderr):
+    """{top-level module: cumulative microseconds} from -X importtime output."""
+    out = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        if name.startswith(" " * 3):
+            continue
+        out[name.strip()] = int(parts[1])
+    return out
+
+
+def _loaded(stderr):
+    names = set()
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            names.add(line.rsplit("|", 1)[1].strip())
+    return names
+
+
+def check(label, argv, cwd, budget_ms, exempt=()):
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", MAIN] + argv, cwd=cwd, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - t0
+
+    top = _import_times(proc.stderr)
+    own_ms = sum(us for name, us in top.items() if name not in exempt) / 1000.0
+    exempt_ms = sum(us for name, us in top.items() if name in exempt) / 1000.0
+    bad = sorted(m for m in FORBIDDEN if m in _loaded(proc.stderr))
+
+    ok = proc.returncode == 0 and not bad and own_ms <= budget_ms
+    print(
+        f"{'ok  ' if ok else 'FAIL'} {label:<12} imports={own_ms:7.1f}ms (budget {budget_ms:.0f}ms)"
+        + (f"  renderer={exempt_ms:7.1f}ms" if exempt else "")
+        + f"  wall={wall:5.2f}s"
+    )
+    if bad:
+        print(f"     loaded resolver modules: {', '.join(bad)}")
+    if proc.returncode != 0:
+        print(f"     exit {proc.returncode}: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else ''}")
+    return ok
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--csv", default=os.path.join(REPO, "countries.csv"), help="existing CSV for `map`")
+    ap.add_argument("--db", default=os.path.join(REPO, "musicbrainz_sqlite_cache.db"), help="cache for `cache stats`")
+    ap.add_argument("--budget-ms", type=float, default=250.0, help="import budget outside the map renderer")
+    args = ap.parse_args(argv)
+
+    work = tempfile.mkdtemp(prefix="import_time_")
+    try:
+        shutil.copy2(args.csv, os.path.join(work, "countries.csv"))
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                shutil.copy2(args.db + suffix, os.path.join(work, "musicbrainz_sqlite_cache.db" + suffix))
+
+        results = [
+            check("map", ["map", "--csv", "countries.csv", "-o", "map.html"], work, args.budget_ms, MAP_RENDERER),
+            check("cache stats", ["cache", "stats"], work, args.budget_ms),
+        ]
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    if not all(results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
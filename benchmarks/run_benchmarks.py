@@ -0,0 +1,284 @@
+"""
+Offline end-to-end benchmark for build_countries_csv.
+
+Serves a synthetic playlist from local stand-ins (benchmarks/stand_ins.py),
+runs the resolver against it in a child process per configuration, and
+appends one line per run to benchmarks/history.jsonl.
+
+    python benchmarks/run_benchmarks.py --sizes 100,1000 --workers 1,2,4
+    python benchmarks/run_benchmarks.py --sizes 10000 --time-scale 0.01
+
+--time-scale shrinks every rate-limit interval (client and stand-in alike)
+so large playlists finish in minutes; MB-lane utilization is unaffected,
+artists/min is reported both as measured and scaled back to real time.
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+HISTORY_FILE = os.path.join(HERE, "history.jsonl")
+
+CACHE_STATES = ("cold", "warm", "partial")
+
+
+def _child(spec):
+    """Runs one build_countries_csv inside this (child) process."""
+    import resource
+
+    sys.path.insert(0, REPO)
+    import config
+
+    config.set_base_dir(spec["base_dir"])
+    for k, v in spec["config"].items():
+        setattr(config, k, v)
+
+    import get_mbid_country as g
+
+    out_csv = config.resolve_path(config.OUTPUT_CSV)
+    cpu0 = time.process_time()
+    t0 = time.perf_counter()
+    g.build_countries_csv(config.PLAYLIST_URL, out_csv)
+    wall = time.perf_counter() - t0
+    cpu = time.process_time() - cpu0
+
+    self_ru = resource.getrusage(resource.RUSAGE_SELF)
+    kids_ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    metrics = {}
+    metrics_path = config.resolve_path(config.METRICS_JSON_FILE)
+    if os.path.exists(metrics_path):
+        with open(metrics_path, encoding="utf-8") as f:
+            metrics = json.load(f)
+
+    print(
+        "BENCH_RESULT "
+        + json.dumps(
+            {
+                "wall_seconds": wall,
+                "cpu_seconds": cpu,
+                "cpu_seconds_children": kids_ru.ru_utime + kids_ru.ru_stime,
+                "peak_rss_mb": max(self_ru.ru_maxrss, kids_ru.ru_maxrss) / 1024.0,
+                "artists": (metrics.get("artists") or {}).get("processed", 0),
+                "methods": (metrics.get("artists") or {}).get("methods", {}),
+                "requests": {k: v.get("count", 0) for k, v in (metrics.get("requests") or {}).items()},
+                "cache_hit_ratio": ((metrics.get("cache") or {}).get("_total") or {}).get("hit_ratio"),
+            }
+        ),
+        flush=True,
+    )
+
+
+def _run_child(spec, verbose=False):
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", json.dumps(spec)],
+        cwd=spec["base_dir"],
+        capture_output=True,
+        text=True,
+    )
+    if verbose:
+        sys.stdout.write(proc.stdout)
+    for line in proc.stdout.splitlines():
+        if line.startswith("BENCH_RESULT "):
+            return json.loads(line[len("BENCH_RESULT ") :])
+    sys.stderr.write(proc.stdout[-4000:])
+    sys.stderr.write(proc.stderr[-4000:])
+    raise RuntimeError(f"benchmark child failed (exit {proc.returncode})")
+
+
+def _thin_cache(db_path, keep_fraction):
+    """Deletes a deterministic share of cache rows: a partially warm cache."""
+    keep_per_mille = int(round(keep_fraction * 1000))
+    conn = sqlite3.connect(db_path)
+    try:
+        keys = [k for (k,) in conn.execute("SELECT key FROM kv_cache;")]
+        drop = [(k,) for k in keys if zlib.crc32(k.encode("utf-8")) % 1000 >= keep_per_mille]
+        conn.executemany("DELETE FROM kv_cache WHERE key = ?;", drop)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _copy_cache(src_dir, dst_dir, db_file):
+    for suffix in ("", "-wal", "-shm"):
+        src = os.path.join(src_dir, db_file + suffix)
+        if os.path.exists(src):
+            shutil.copy2(src, os.path.join(dst_dir, db_file + suffix))
+
+
+def _git_rev():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True, text=True
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _load_history():
+    if not os.path.exists(HISTORY_FILE):
+        return []
+    with open(HISTORY_FILE, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _config_key(rec):
+    return (rec["size"], rec["workers"], rec["cache"], rec["time_scale"], rec.get("mix"))
+
+
+def run(sizes, workers_list, cache_states, time_scale, partial_keep, seed, verbose=False, record=True):
+    sys.path.insert(0, HERE)
+    import stand_ins
+
+    db_file = "musicbrainz_sqlite_cache.db"
+    mb_interval = 1.0 * time_scale
+    history = _load_history()
+    previous = {}
+    for rec in history:
+        previous[_config_key(rec)] = rec
+
+    rev = _git_rev()
+    out = []
+    for size in sizes:
+        world = stand_ins.SyntheticWorld(size, seed=seed)
+        server = stand_ins.StandInServer(world, mb_interval=mb_interval).start()
+        seed_dir = tempfile.mkdtemp(prefix=f"bench_seed_{size}_")
+        try:
+            for workers in workers_list:
+                for state in cache_states:
+                    base_dir = tempfile.mkdtemp(prefix=f"bench_{size}_{workers}_{state}_")
+                    try:
+                        if state != "cold":
+                            if not os.path.exists(os.path.join(seed_dir, db_file)):
+                                # Warm the seed cache with one unrecorded cold run.
+                                _run_child(
+                                    _spec(server, seed_dir, workers, time_scale, db_file), verbose=verbose
+                                )
+                            _copy_cache(seed_dir, base_dir, db_file)
+                            if state == "partial":
+                                _thin_cache(os.path.join(base_dir, db_file), partial_keep)
+
+                        server.stats.reset()
+                        res = _run_child(_spec(server, base_dir, workers, time_scale, db_file), verbose=verbose)
+                        stats = server.stats.snapshot()
+                    finally:
+                        shutil.rmtree(base_dir, ignore_errors=True)
+
+                    wall = max(1e-9, res["wall_seconds"])
+                    mb_ok = stats["requests"]["mb"] - stats["mb_503"]
+                    rec = {
+                        "ts": time.time(),
+                        "git_rev": rev,
+                        "size": size,
+                        "workers": workers,
+                        "cache": state,
+                        "time_scale": time_scale,
+                        "mix": "default",
+                        "seed": seed,
+                        "wall_seconds": round(wall, 3),
+                        "artists": res["artists"],
+                        "artists_per_min": round(res["artists"] / (wall / 60.0), 2),
+                        "artists_per_min_realtime": round(res["artists"] / (wall / 60.0) * time_scale, 2),
+                        "mb_requests": stats["requests"]["mb"],
+                        "mb_503": stats["mb_503"],
+                        "mb_lane_utilization": round(min(1.0, mb_ok * mb_interval / wall), 4),
+                        "lb_requests": stats["requests"]["lb"],
+                        "spotify_requests": stats["requests"]["spotify"],
+                        "cache_hit_ratio": res["cache_hit_ratio"],
+                        "peak_rss_mb": round(res["peak_rss_mb"], 1),
+                        "cpu_seconds": round(res["cpu_seconds"] + res["cpu_seconds_children"], 3),
+                        "methods": res["methods"],
+                    }
+                    _print_row(rec, previous.get(_config_key(rec)))
+                    out.append(rec)
+                    if record:
+                        with open(HISTORY_FILE, "a", encoding="utf-8") as f:
+                            f.write(json.dumps(rec, sort_keys=True) + "\n")
+        finally:
+            server.stop()
+            shutil.rmtree(seed_dir, ignore_errors=True)
+    return out
+
+
+def _spec(server, base_dir, workers, time_scale, db_file):
+    cfg = dict(server.config_overrides())
+    cfg.update(
+        {
+            "DB_FILE": db_file,
+            "OUTPUT_CSV": "countries.csv",
+            "MB_MIN_INTERVAL_SECONDS": 1.05 * time_scale,
+            "LB_MIN_INTERVAL_SECONDS": 0.20 * time_scale,
+            "SPOTIFY_STAGE_WORKERS": workers,
+            "LB_STAGE_WORKERS": workers,
+            "MB_STAGE_WORKERS": workers,
+            "COUNTRY_STAGE_WORKERS": workers,
+            "MIGRATE_PICKLE_TO_SQLITE": False,
+            "TRACE_DIR": None,
+            "METRICS_PROM_FILE": None,
+        }
+    )
+    return {"base_dir": base_dir, "config": cfg}
+
+
+def _print_row(rec, prev):
+    line = (
+        f"size={rec['size']:<6} workers={rec['workers']:<3} cache={rec['cache']:<8} "
+        f"wall={rec['wall_seconds']:>9.1f}s  artists/min={rec['artists_per_min']:>9.1f} "
+        f"(real-time {rec['artists_per_min_realtime']:>7.1f})  mb_util={rec['mb_lane_utilization']:.2f} "
+        f"mb_503={rec['mb_503']:<3} rss={rec['peak_rss_mb']:.0f}MB cpu={rec['cpu_seconds']:.1f}s"
+    )
+    if prev:
+        before = prev.get("artists_per_min") or 0.0
+        delta = ((rec["artists_per_min"] - before) / before * 100.0) if before else 0.0
+        line += f"  vs {prev.get('git_rev') or '?'}: {delta:+.1f}%"
+    print(line, flush=True)
+
+
+def _int_list(s):
+    return [int(x) for x in s.split(",") if x.strip()]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=_int_list, default=[100], help="playlist sizes, e.g. 100,1000,10000")
+    ap.add_argument("--workers", type=_int_list, default=[1, 2, 4], help="threads per pipeline stage")
+    ap.add_argument("--cache", default=",".join(CACHE_STATES), help="cache states: cold,warm,partial")
+    ap.add_argument("--time-scale", type=float, default=1.0, help="multiplier on every rate-limit interval")
+    ap.add_argument("--partial-keep", type=float, default=0.5, help="share of cache rows kept for 'partial'")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--no-record", action="store_true", help="do not append to history.jsonl")
+    ap.add_argument("--verbose", action="store_true", help="echo resolver output")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.child:
+        _child(json.loads(args.child))
+        return
+
+    states = [s for s in args.cache.split(",") if s]
+    unknown = set(states) - set(CACHE_STATES)
+    if unknown:
+        ap.error(f"unknown cache state(s): {', '.join(sorted(unknown))}")
+
+    run(
+        args.sizes,
+        args.workers,
+        states,
+        args.time_scale,
+        args.partial_keep,
+        args.seed,
+        verbose=args.verbose,
+        record=not args.no_record,
+    )
+
+
+if __name__ == "__main__":
+    main()
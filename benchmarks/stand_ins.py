@@ -0,0 +1,371 @@
+"""
+Local HTTP stand-ins for Spotify, MusicBrainz and ListenBrainz, serving a
+synthetic playlist whose artists resolve at a chosen mix of ladder steps,
+and a local translation backend.
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+# Share of artists that first resolve at each step of the ladder.
+DEFAULT_MIX = {"16a": 0.55, "16b": 0.20, "16c": 0.12, "16d": 0.05, "none": 0.08}
+
+_SYLLABLES = [
+    "ka", "lo", "mi", "ra", "ne", "to", "su", "vi", "da", "re", "zo", "an", "el", "or", "ix",
+    "ba", "qu", "ly", "fe", "go", "hu", "ja", "ki", "mo", "ny", "pa", "si", "tu", "we", "yo",
+]
+_COUNTRIES = ["US", "GB", "SE", "DE", "FR", "JP", "KR", "BR", "CA", "AU", "NO", "FI", "IT", "ES", "MX"]
+
+PLAYLIST_ID = "benchplaylist000000000"
+
+
+class SyntheticWorld:
+    def __init__(self, n_artists, mix=None, seed=7, tracks_per_artist=3, decoys=4):
+        rnd = random.Random(seed)
+        mix = mix or DEFAULT_MIX
+        steps = list(mix.keys())
+        weights = [mix[k] for k in steps]
+
+        self.artists = []
+        self.by_spotify = {}
+        self.by_mbid = {}
+        self.by_name = {}
+
+        for i in range(n_artists):
+            words = 1 + (i % 3 != 0)
+            name = " ".join(
+                "".join(rnd.choice(_SYLLABLES) for _ in range(rnd.randint(2, 3))).title() for _ in range(words)
+            )
+            name = f"{name} {i}"
+            a = {
+                "i": i,
+                "name": name,
+                "spotify_id": f"b{i:021d}",
+                "mbid": str(uuid.UUID(int=rnd.getrandbits(128), version=4)),
+                "country": rnd.choice(_COUNTRIES),
+                "step": rnd.choices(steps, weights)[0],
+                "tracks": [
+                    {"name": f"Song {i}-{t}", "isrc": f"XX{i:07d}{t:03d}"} for t in range(tracks_per_artist)
+                ],
+            }
+            self.artists.append(a)
+            self.by_spotify[a["spotify_id"]] = a
+            self.by_mbid[a["mbid"]] = a
+            self.by_name[name.lower()] = a
+
+        self.decoys = decoys
+
+    # -- MusicBrainz -------------------------------------------------------
+
+    def mb_artist_doc(self, a):
+        doc = {"id": a["mbid"], "name": a["name"], "sort-name": a["name"], "type": "Group", "aliases": []}
+        if a["step"] != "none":
+            doc["country"] = a["country"]
+        if a["step"] == "16a":
+            doc["relations"] = [
+                {"type": "free streaming", "url": {"resource": f"https://open.spotify.com/artist/{a['spotify_id']}"}}
+            ]
+        else:
+            doc["relations"] = []
+        return doc
+
+    def mb_search(self, name, limit, offset):
+        a = self.by_name.get(name.lower())
+        out = []
+        if a is not None and a["step"] in ("16c", "16d"):
+            out.append(dict(self.mb_artist_doc(a), score=100))
+        for d in range(self.decoys):
+            out.append(
+                {
+                    "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{name}/{d}")),
+                    "name": f"{name.split()[0]} Decoy{d}",
+                    "sort-name": f"Decoy{d}",
+                    "score": 40 - d,
+                    "aliases": [],
+                }
+            )
+        return out[offset : offset + limit]
+
+    def mb_recordings(self, mbid):
+        """Browse result for an artist's recordings; only 16c artists have any, as in mb_recording_hits."""
+        a = self.by_mbid.get(mbid)
+        if a is None or a["step"] != "16c":
+            return []
+        return [
+            {"id": str(uuid.uuid5(uuid.NAMESPACE_URL, t["isrc"])), "title": t["name"], "isrcs": [t["isrc"]]}
+            for t in a["tracks"]
+        ]
+
+    def mb_recording_hits(self, query):
+        m = re.search(r"arid:([0-9a-f-]{36})", query)
+        a = self.by_mbid.get(m.group(1)) if m else None
+        if a is None or a["step"] != "16c":
+            return 0
+        isrc = re.search(r"isrc:([A-Z0-9]{12})", query)
+        if isrc:
+            return int(any(t["isrc"] == isrc.group(1) for t in a["tracks"]))
+        return 0
+
+
+class _Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counts = {"spotify": 0, "mb": 0, "lb": 0}
+            self.mb_violations = 0
+            self.first_mb = None
+            self.last_mb = None
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "requests": dict(self.counts),
+                "mb_503": self.mb_violations,
+                "mb_first_ts": self.first_mb,
+                "mb_last_ts": self.last_mb,
+            }
+
+
+class StandInTranslator:
+    """
+    Local translation backend (see translation.TranslatorBackend): "Name"
+    comes back as "Name [dest]" after `latency` seconds. Select it with
+    TRANSLATE_BACKEND = "stand_ins:StandInTranslator" (benchmarks/ on sys.path).
+    """
+
+    latency = 0.05
+
+    def __init__(self):
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def translate(self, text, src, dest):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        return f"{text} [{dest}]"
+
+    async def aclose(self):
+        pass
+
+
+class StandInServer:
+    """
+    One local server for all three upstreams:
+      /v1/..., /api/token   Spotify
+      /ws/2/...             MusicBrainz, 503 when called faster than mb_interval
+      /1/...                ListenBrainz
+    """
+
+    def __init__(self, world, mb_interval=1.0, host="127.0.0.1", port=0, latency=0.0, mb_slack=0.1):
+        self.world = world
+        self.mb_interval = mb_interval
+        # Arrival jitter allowance: gaps down to (1 - mb_slack) * mb_interval pass.
+        self.mb_slack = mb_slack
+        self.latency = latency
+        self.stats = _Stats()
+        self._mb_lock = threading.Lock()
+        self._mb_last = 0.0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self.rfile.read(length)
+                if self.path.startswith("/api/token"):
+                    return self._json({"access_token": "bench", "token_type": "Bearer", "expires_in": 3600})
+                return self._json({}, 404)
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                u = urlparse(self.path)
+                q = {k: v[0] for k, v in parse_qs(u.query).items()}
+                if u.path.startswith("/v1/"):
+                    return server._spotify(self, u.path, q)
+                if u.path.startswith("/ws/2/"):
+                    return server._mb(self, u.path, q)
+                if u.path.startswith("/1/"):
+                    return server._lb(self, u.path, q)
+                return self._json({}, 404)
+
+            def _json(self, payload, status=200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def config_overrides(self):
+        return {
+            "MB_BASE_URL": f"{self.base}/ws/2/",
+            "LB_BASE_URL": f"{self.base}/1/",
+            "SPOTIFY_API_PREFIX": f"{self.base}/v1/",
+            "SPOTIFY_TOKEN_URL": f"{self.base}/api/token",
+            "SPOTIFY_CLIENT_ID": "bench",
+            "SPOTIFY_CLIENT_SECRET": "bench",
+            "PLAYLIST_URL": f"https://open.spotify.com/playlist/{PLAYLIST_ID}",
+        }
+
+    def _count(self, kind):
+        with self.stats.lock:
+            self.stats.counts[kind] += 1
+
+    # -- Spotify -------------------------------------------------------------
+
+    def _spotify(self, h, path, q):
+        self._count("spotify")
+        w = self.world
+        m = re.fullmatch(r"/v1/playlists/([^/]+)/(tracks|items)", path)
+        if m:
+            offset = int(q.get("offset", 0))
+            limit = int(q.get("limit", 100))
+            page = w.artists[offset : offset + limit]
+            items = [
+                {
+                    "track": {
+                        "name": a["tracks"][0]["name"],
+                        "artists": [
+                            {
+                                "id": a["spotify_id"],
+                                "name": a["name"],
+                                "external_urls": {"spotify": f"https://open.spotify.com/artist/{a['spotify_id']}"},
+                            }
+                        ],
+                    }
+                }
+                for a in page
+            ]
+            nxt = None
+            if offset + limit < len(w.artists):
+                nxt = f"{self.base}/v1/playlists/{m.group(1)}/{m.group(2)}?offset={offset + limit}&limit={limit}"
+            return h._json({"items": items, "next": nxt, "total": len(w.artists), "offset": offset, "limit": limit})
+
+        m = re.fullmatch(r"/v1/artists/([^/]+)/top-tracks", path)
+        if m:
+            a = w.by_spotify.get(m.group(1))
+            if a is None:
+                return h._json({"error": {"status": 404}}, 404)
+            tracks = [{"name": t["name"], "external_ids": {"isrc": t["isrc"]}} for t in a["tracks"]]
+            return h._json({"tracks": tracks})
+
+        m = re.fullmatch(r"/v1/artists/([^/]+)", path)
+        if m:
+            a = w.by_spotify.get(m.group(1))
+            if a is None:
+                return h._json({"error": {"status": 404}}, 404)
+            return h._json(
+                {
+                    "id": a["spotify_id"],
+                    "name": a["name"],
+                    "genres": [],
+                    "followers": {"total": 1000},
+                    "popularity": 50,
+                    "external_urls": {"spotify": f"https://open.spotify.com/artist/{a['spotify_id']}"},
+                }
+            )
+
+        return h._json({"error": {"status": 404}}, 404)
+
+    # -- MusicBrainz ---------------------------------------------------------
+
+    def _mb(self, h, path, q):
+        now = time.time()
+        with self._mb_lock:
+            too_fast = self._mb_last and (now - self._mb_last) < self.mb_interval * (1.0 - self.mb_slack)
+            if not too_fast:
+                self._mb_last = now
+        with self.stats.lock:
+            self.stats.counts["mb"] += 1
+            if too_fast:
+                self.stats.mb_violations += 1
+            else:
+                self.stats.first_mb = self.stats.first_mb or now
+                self.stats.last_mb = now
+        if too_fast:
+            return h._json({"error": "rate limit exceeded"}, 503)
+
+        w = self.world
+        if path == "/ws/2/url/":
+            m = re.search(r"artist/([A-Za-z0-9]{22})", unquote(unquote(q.get("query", ""))))
+            a = w.by_spotify.get(m.group(1)) if m else None
+            if a is None or a["step"] != "16a":
+                return h._json({"count": 0, "urls": []})
+            rel = {"artist": {"id": a["mbid"], "name": a["name"]}}
+            return h._json({"count": 1, "urls": [{"relation-list": [{"relations": [rel]}]}]})
+
+        if path == "/ws/2/artist/":
+            query = q.get("query", "")
+            m = re.search(r'artist:"([^"]+)"', query)
+            name = m.group(1) if m else ""
+            limit = int(q.get("limit", 25))
+            offset = int(q.get("offset", 0))
+            return h._json({"artists": w.mb_search(name, limit, offset)})
+
+        m = re.fullmatch(r"/ws/2/artist/([0-9a-f-]{36})", path)
+        if m:
+            a = w.by_mbid.get(m.group(1))
+            if a is None:
+                return h._json({"error": "not found"}, 404)
+            return h._json(w.mb_artist_doc(a))
+
+        if path == "/ws/2/recording/" and q.get("artist"):
+            recs = w.mb_recordings(q["artist"])
+            offset = int(q.get("offset", 0))
+            page = recs[offset : offset + int(q.get("limit", 25))]
+            return h._json({"recording-count": len(recs), "recording-offset": offset, "recordings": page})
+
+        if path == "/ws/2/recording/":
+            hits = w.mb_recording_hits(q.get("query", ""))
+            return h._json({"recording-count": hits, "count": hits, "recordings": []})
+
+        return h._json({"error": "not found"}, 404)
+
+    # -- ListenBrainz --------------------------------------------------------
+
+    def _lb(self, h, path, q):
+        self._count("lb")
+        if path != "/1/metadata/lookup/":
+            return h._json({}, 404)
+        a = self.world.by_name.get((q.get("artist_name") or "").lower())
+        if a is None or a["step"] != "16b":
+            return h._json({})
+        if q.get("recording_name") not in {t["name"] for t in a["tracks"]}:
+            return h._json({})
+        return h._json({"artist_mbids": [a["mbid"]]})
@@ -2,6 +2,12 @@ import os
 
 PLAYLIST_URL = ""           # Replace with your own Spotify Playlist
 
+# Batch mode: when non-empty, main.py resolves all of these playlists in one
+# run (artists shared between playlists are resolved once) and writes one
+# CSV + map per playlist into BATCH_OUTPUT_DIR.
+PLAYLIST_URLS = []
+BATCH_OUTPUT_DIR = "playlists"
+
 # https://developer.spotify.com/documentation/web-api
 
 SPOTIFY_CLIENT_ID = ""      # Replace with your Spotify Client ID
@@ -10,19 +16,132 @@ LISTENBRAINZ_TOKEN = "67b66a3a-42d5-4888-a9a1-5ba39952c4c2"
 
 OUTPUT_CSV = "countries.csv"
 
+# Dry run: only fetch the playlist(s) and print the expected MB/LB/Spotify
+# requests and wall time from the cache and the last run's metrics.
+DRY_RUN = False
+
+# Offline mode: no network at all. Re-resolves the artists already in
+# OUTPUT_CSV from the SQLite cache and writes <name>.offline.csv plus
+# <name>.misses.csv (first missing cache key and step per unresolved artist).
+OFFLINE = False
+
 USER_AGENT = "CountryExtractorBot/1.0 (MusicBrainzCountryApp@gmail.com)"
 
+# Upstream endpoints. Only changed to point at local stand-ins (benchmarks/).
+MB_BASE_URL = "https://musicbrainz.org/ws/2/"
+LB_BASE_URL = "https://api.listenbrainz.org/1/"
+SPOTIFY_API_PREFIX = None   # default: spotipy's https://api.spotify.com/v1/
+SPOTIFY_TOKEN_URL = None    # default: spotipy's accounts.spotify.com token URL
+
 DB_FILE = "musicbrainz_sqlite_cache.db"
 
+# Compiled gazetteer (country names, demonyms, cities) for country inference,
+# built on first use and rebuilt when geonamescache/pycountry change.
+GAZETTEER_FILE = "gazetteer.idx"
+
+# Local index of every MB artist seen in a cached search, by normalized name,
+# sort-name and alias, with character trigrams for fuzzy lookup
+# (artist_index.py). Step16c looks there before searching MB; candidates
+# scoring below ARTIST_INDEX_MIN_SIMILARITY (trigram Jaccard) are ignored.
+# It also maps Spotify artist IDs to the MBIDs whose fetched url relations
+# link them, which step16a checks before the MB url search. None disables it.
+ARTIST_INDEX_FILE = "artist_index.db"
+ARTIST_INDEX_MIN_SIMILARITY = 0.4
+
 LEGACY_PICKLE_CACHE_FILE = "musicbrainz_cache.pkl"
 MIGRATE_PICKLE_TO_SQLITE = True
 
 MB_MIN_INTERVAL_SECONDS = 1.05
 LB_MIN_INTERVAL_SECONDS = 0.20
 
-MAX_WORKERS = 8
+# Staged pipeline: one thread pool per upstream lane, linked by bounded queues.
+SPOTIFY_STAGE_WORKERS = 2
+LB_STAGE_WORKERS = 2
+MB_STAGE_WORKERS = 3
+COUNTRY_STAGE_WORKERS = 2
+STAGE_QUEUE_SIZE = 32
+
+# spaCy / lingua inference runs in a process pool (0 = inline in the calling
+# thread). Each worker process loads the models once.
+NLP_PROCESS_WORKERS = 2
+NLP_BATCH_SIZE = 32
+NLP_BATCH_WAIT_SECONDS = 0.01
+
+# spaCy NER for country inference. Only the entity recognizer (and what it
+# listens to) runs; undecided texts are batched through nlp.pipe and their
+# entities memoized per text (SPACY_MEMO_SIZE entries per process).
+SPACY_MODEL = "en_core_web_sm"
+SPACY_BATCH_SIZE = 64
+SPACY_MEMO_SIZE = 65536
+
+# lingua language detector, built on first use. LINGUA_LANGUAGES restricts it
+# to a list of ISO 639-1 codes (at least two); the default covers the
+# languages most track titles are written in, None loads every language.
+# Low-accuracy mode is faster and much lighter but less reliable on very
+# short texts. NLP_PRELOAD builds the spaCy model and the detector (with all
+# its language models) when a run starts. An artist's detected track
+# language is cached per Spotify ID for these settings.
+LINGUA_LANGUAGES = [
+    "en", "es", "pt", "fr", "de", "it", "nl", "sv", "nb", "da", "fi", "pl", "ru",
+    "uk", "tr", "el", "ar", "he", "hi", "th", "vi", "id", "ja", "ko", "zh",
+]
+LINGUA_LOW_ACCURACY = False
+NLP_PRELOAD = False
+
+# Artist-name translation runs on one background event loop (translation.py)
+# with at most TRANSLATE_CONCURRENCY requests in flight. TRANSLATE_BACKEND is
+# a "module:factory" path returning a translation.TranslatorBackend; None
+# uses googletrans. Successful translations are cached per (text, source,
+# target) language.
+TRANSLATE_BACKEND = None
+TRANSLATE_CONCURRENCY = 4
+TRANSLATE_TIMEOUT_SECONDS = 20
+# An artist's second translation (from "en") is normally only requested when
+# the first is unusable. True submits both at once: lower latency, but twice
+# the calls to the translation service.
+TRANSLATE_EAGER_PAIR = False
+
+# Multi-process mode: RESOLVER_PROCESSES > 1 runs that many worker processes
+# (each with MP_THREADS_PER_PROCESS threads) claiming artists from a shared
+# SQLite work table. SHARED_RATE_LIMIT makes MB/LB spacing host-wide through
+# RATE_LIMIT_DB_FILE; worker processes always turn it on.
+RESOLVER_PROCESSES = 1
+MP_THREADS_PER_PROCESS = 4
+WORK_DB_FILE = "work_queue.db"
+WORK_LEASE_SECONDS = 300
+# Tries per artist, counting workers that died holding it, before it is
+# finished with no result.
+WORK_MAX_ATTEMPTS = 3
+SHARED_RATE_LIMIT = False
+RATE_LIMIT_DB_FILE = "rate_limit_state.db"
+
+# Per-run metrics (step timings, requests per upstream, rate-limit waits,
+# cache hit ratios, throughput). METRICS_PROM_FILE is an optional Prometheus
+# textfile-collector path, e.g. "/var/lib/node_exporter/textfile/spotify_mbid.prom".
+METRICS_JSON_FILE = "run_metrics.json"
+METRICS_PROM_FILE = None
+
+# Opt-in per-artist resolution traces (steps, HTTP calls, cache hits/misses,
+# step16c candidates and validation reasons). Set to a directory to enable;
+# summarize with `python tracing.py traces/trace_*.jsonl`.
+TRACE_DIR = None
 SAVE_EVERY_N_ARTISTS = 25
 
+# Entries per memoized name/title normalizer (normalize.py).
+NORMALIZE_MEMO_SIZE = 65536
+
+# Memoized free-text answers of the country-name resolver (country_names.py);
+# exact country names never need an entry.
+COUNTRY_NAME_MEMO_SIZE = 65536
+
+# Step16c recording checks: with MB_RECORDING_BROWSE an artist's recordings
+# (with ISRCs) are browsed once, 100 per request for up to
+# MB_RECORDING_BROWSE_MAX_PAGES requests, and cached per MBID; top-track
+# titles and ISRCs are matched against that set instead of one MB search per
+# track. Titles an incomplete browse does not contain are still searched.
+MB_RECORDING_BROWSE = True
+MB_RECORDING_BROWSE_MAX_PAGES = 2
+
 STEP1B_TOP_N = 2
 STEP1B_MIN_SCORE = 45
 STEP1B_DO_RECORDING_CHECK_IF_AMBIGUOUS_ONLY = True
@@ -0,0 +1,140 @@
+import re
+import threading
+from functools import lru_cache
+from importlib.util import find_spec
+
+import config
+from normalize import normalize_name, normalize_text_simple
+
+# country_converter's own coco.convert() re-reads its data table on every
+# call. Here the table is loaded once: exact country names become one dict,
+# and only other texts run coco's regexes, with the answer memoized.
+_COCO_OK = find_spec("country_converter") is not None
+_PYCOUNTRY_OK = find_spec("pycountry") is not None
+
+_ISO2_RE = re.compile(r"[A-Z]{2}")
+# coco.convert's default exclude_prefix: "China excluding Hong Kong" is "China".
+_EXCLUDER = re.compile(r"excl\w.*|without|w/o")
+
+_TABLE = None
+_LOCK = threading.Lock()
+
+
+class _Table:
+    """coco's country table, reduced to what name resolution needs."""
+
+    def __init__(self):
+        self.names = {}
+        self.regexes = []
+        self.iso2_regexes = []
+        self.iso2 = []
+        self.iso3 = {}
+        self.numeric = {}
+
+        if _COCO_OK:
+            import country_converter as coco
+
+            cc = coco.CountryConverter()
+            self.regexes = cc.regexes
+            self.iso2_regexes = cc.iso2_regexes
+            for row in cc.data[["ISO2", "ISO3", "ISOnumeric", "name_short", "name_official"]].itertuples():
+                iso2 = "".join(c for c in str(row.ISO2).split("|")[0] if c.isalnum()).upper()
+                self.iso2.append(iso2)
+                self.iso3[re.sub(r"\..*", "", str(row.ISO3)).lower()] = iso2
+                self.numeric[re.sub(r"\..*", "", str(row.ISOnumeric))] = iso2
+                for name in (row.name_short, row.name_official):
+                    if isinstance(name, str) and name:
+                        self.names.setdefault(normalize_name(name), iso2)
+
+        if _PYCOUNTRY_OK:
+            import pycountry
+
+            for c in pycountry.countries:
+                for attr in ("name", "official_name", "common_name"):
+                    name = getattr(c, attr, None)
+                    if name:
+                        self.names.setdefault(normalize_name(name), c.alpha_2)
+
+        self.names = {k: v for k, v in self.names.items() if k and _ISO2_RE.fullmatch(v)}
+
+
+def _table():
+    global _TABLE
+    if _TABLE is None:
+        with _LOCK:
+            if _TABLE is None:
+                _TABLE = _Table()
+    return _TABLE
+
+
+def to_iso2(text):
+    """
+    ISO2 for a country name, code or free text the way coco.convert reads
+    it, or None when nothing or more than one country matches.
+    """
+    if not text:
+        return None
+    iso2 = _table().names.get(normalize_name(text))
+    if iso2:
+        return iso2
+    return _match(str(text))
+
+
+@lru_cache(maxsize=config.COUNTRY_NAME_MEMO_SIZE)
+def _match(text):
+    """coco.convert(text, to="ISO2") on the preloaded table, for texts that are not a known name."""
+    t = _table()
+    name = _EXCLUDER.split(text)[0]
+    try:
+        int(name)
+        hits = [t.numeric.get(name)]
+    except ValueError:
+        if len(name) == 3:
+            hits = [t.iso3.get(name.lower())]
+        else:
+            regexes = t.iso2_regexes if len(name) == 2 else t.regexes
+            hits = [t.iso2[i] for i, rx in enumerate(regexes) if rx.search(name)]
+
+    if len(hits) == 1 and hits[0] and _ISO2_RE.fullmatch(hits[0]):
+        return hits[0]
+    return None
+
+
+def norp_candidates(norp_text):
+    """Country names a nationality/demonym ("Swedish", "South Korean") may stand for."""
+    t = normalize_text_simple(norp_text)
+    if not t:
+        return []
+    if "south korean" in t:
+        return ["South Korea", "Korea, Republic of", "Korea"]
+    if "north korean" in t:
+        return ["North Korea", "Korea, Democratic People's Republic of", "Korea"]
+    if t == "korean":
+        return ["South Korea", "Korea, Republic of", "Korea"]
+    if t == "american":
+        return ["United States", "United States of America", "USA", "America"]
+    if t == "british":
+        return ["United Kingdom", "UK", "Great Britain", "Britain"]
+
+    cands = [norp_text]
+    suffixes = ["ese", "ish", "ian", "ean", "an"]
+    for suf in suffixes:
+        if t.endswith(suf) and len(t) > len(suf) + 2:
+            base = t[: -len(suf)]
+            cands.append(base.title())
+            cands.append((base + "a").title())
+            cands.append((base + "e").title())
+            cands.append((base + "ia").title())
+            cands.append((base + "land").title())
+
+    out, seen = [], set()
+    for x in cands:
+        k = normalize_text_simple(x)
+        if k and k not in seen:
+            seen.add(k)
+            out.append(x)
+    return out
+
+
+def cache_info():
+    return _match.cache_info()
@@ -0,0 +1,501 @@
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import deque
+from importlib import metadata
+from importlib.util import find_spec
+
+import config
+from normalize import normalize_name
+
+# Country names and demonyms as they appear in MusicBrainz disambiguations
+# ("British rock band", "rapper from Atlanta, USA", "Japanese singer"). Names
+# that are also common words or given names (Chad, Jordan, Georgia, Jersey,
+# Turkey, Guinea, Niger) are deliberately left out.
+COUNTRY_TERMS = {
+    "AF": ("afghanistan", "afghan"),
+    "AL": ("albania", "albanian"),
+    "DZ": ("algeria", "algerian"),
+    "AR": ("argentina", "argentine", "argentinian", "argentinean"),
+    "AM": ("armenia", "armenian"),
+    "AU": ("australia", "australian"),
+    "AT": ("austria", "austrian"),
+    "AZ": ("azerbaijan", "azerbaijani"),
+    "BD": ("bangladesh", "bangladeshi"),
+    "BY": ("belarus", "belarusian"),
+    "BE": ("belgium", "belgian"),
+    "BO": ("bolivia", "bolivian"),
+    "BA": ("bosnia", "bosnian", "bosnia and herzegovina"),
+    "BR": ("brazil", "brazilian"),
+    "BG": ("bulgaria", "bulgarian"),
+    "KH": ("cambodia", "cambodian"),
+    "CM": ("cameroon", "cameroonian"),
+    "CA": ("canada", "canadian", "quebec", "quebecois"),
+    "CL": ("chile", "chilean"),
+    "CN": ("china", "chinese", "mainland china"),
+    "CO": ("colombia", "colombian"),
+    "CR": ("costa rica", "costa rican"),
+    "HR": ("croatia", "croatian"),
+    "CU": ("cuba", "cuban"),
+    "CY": ("cyprus", "cypriot"),
+    "CZ": ("czech republic", "czechia", "czech"),
+    "DK": ("denmark", "danish"),
+    "EC": ("ecuador", "ecuadorian"),
+    "EG": ("egypt", "egyptian"),
+    "SV": ("el salvador", "salvadoran"),
+    "EE": ("estonia", "estonian"),
+    "ET": ("ethiopia", "ethiopian"),
+    "FO": ("faroe islands", "faroese"),
+    "FI": ("finland", "finnish"),
+    "FR": ("france", "french"),
+    "DE": ("germany", "german"),
+    "GH": ("ghana", "ghanaian"),
+    "GR": ("greece", "greek"),
+    "GL": ("greenland", "greenlandic"),
+    "GT": ("guatemala", "guatemalan"),
+    "HT": ("haiti", "haitian"),
+    "HN": ("honduras", "honduran"),
+    "HK": ("hong kong",),
+    "HU": ("hungary", "hungarian"),
+    "IS": ("iceland", "icelandic"),
+    "IN": ("india", "indian"),
+    "ID": ("indonesia", "indonesian"),
+    "IR": ("iran", "iranian"),
+    "IQ": ("iraq", "iraqi"),
+    "IE": ("ireland", "irish", "republic of ireland"),
+    "IL": ("israel", "israeli"),
+    "IT": ("italy", "italian"),
+    "JM": ("jamaica", "jamaican"),
+    "JP": ("japan", "japanese"),
+    "KZ": ("kazakhstan", "kazakh", "kazakhstani"),
+    "KE": ("kenya", "kenyan"),
+    "KR": ("south korea", "south korean", "korea", "korean", "republic of korea"),
+    "KP": ("north korea", "north korean"),
+    "LV": ("latvia", "latvian"),
+    "LB": ("lebanon", "lebanese"),
+    "LT": ("lithuania", "lithuanian"),
+    "LU": ("luxembourg", "luxembourgish"),
+    "MY": ("malaysia", "malaysian"),
+    "MT": ("malta", "maltese"),
+    "MX": ("mexico", "mexican"),
+    "MD": ("moldova", "moldovan"),
+    "MN": ("mongolia", "mongolian"),
+    "ME": ("montenegro", "montenegrin"),
+    "MA": ("morocco", "moroccan"),
+    "NP": ("nepal", "nepali", "nepalese"),
+    "NL": ("netherlands", "the netherlands", "holland", "dutch"),
+    "NZ": ("new zealand", "new zealander"),
+    "NG": ("nigeria", "nigerian"),
+    "MK": ("north macedonia", "macedonia", "macedonian"),
+    "NO": ("norway", "norwegian"),
+    "PK": ("pakistan", "pakistani"),
+    "PA": ("panama", "panamanian"),
+    "PY": ("paraguay", "paraguayan"),
+    "PE": ("peru", "peruvian"),
+    "PH": ("philippines", "filipino", "filipina", "philippine"),
+    "PL": ("poland", "polish"),
+    "PT": ("portugal", "portuguese"),
+    "PR": ("puerto rico", "puerto rican"),
+    "RO": ("romania", "romanian"),
+    "RU": ("russia", "russian", "russian federation"),
+    "SA": ("saudi arabia", "saudi"),
+    "SN": ("senegal", "senegalese"),
+    "RS": ("serbia", "serbian"),
+    "SG": ("singapore", "singaporean"),
+    "SK": ("slovakia", "slovak", "slovakian"),
+    "SI": ("slovenia", "slovenian", "slovene"),
+    "ZA": ("south africa", "south african"),
+    "ES": ("spain", "spanish", "catalan", "catalonia", "basque"),
+    "LK": ("sri lanka", "sri lankan"),
+    "SE": ("sweden", "swedish"),
+    "CH": ("switzerland", "swiss"),
+    "SY": ("syria", "syrian"),
+    "TW": ("taiwan", "taiwanese"),
+    "TH": ("thailand", "thai"),
+    "TN": ("tunisia", "tunisian"),
+    "TR": ("turkish",),
+    "UA": ("ukraine", "ukrainian"),
+    "GB": (
+        "united kingdom",
+        "great britain",
+        "britain",
+        "british",
+        "england",
+        "english",
+        "scotland",
+        "scottish",
+        "wales",
+        "welsh",
+        "northern ireland",
+        "northern irish",
+    ),
+    "US": ("united states", "united states of america", "america", "american"),
+    "UY": ("uruguay", "uruguayan"),
+    "UZ": ("uzbekistan", "uzbek"),
+    "VE": ("venezuela", "venezuelan"),
+    "VN": ("vietnam", "viet nam", "vietnamese"),
+    "ZW": ("zimbabwe", "zimbabwean"),
+}
+
+# Phrases that contain a country term but do not name that country. They are
+# matched (longest first) so their words are consumed; None names no country.
+OVERRIDES = {
+    "latin america": None,
+    "latin american": None,
+    "south america": None,
+    "south american": None,
+    "north america": None,
+    "north american": None,
+    "central america": None,
+    "central american": None,
+    "west indies": None,
+    "west indian": None,
+    "new england": "US",
+    "new mexico": "US",
+    "new south wales": "AU",
+    "british columbia": "CA",
+}
+
+# A term followed by one of these names a language, not a country
+# ("Spanish-language rapper from Miami", "French-speaking Swiss band").
+LANGUAGE_WORDS = frozenset(("language", "speaking"))
+
+# Only matched in their original upper case ("US rapper", never "with us").
+ABBREVIATIONS = {"US": "US", "USA": "US", "U.S.": "US", "U.S.A.": "US", "UK": "GB", "U.K.": "GB"}
+
+_ABBREV_RE = re.compile(r"(?<![\w.])(U\.S\.A\.|U\.S\.|U\.K\.|USA|US|UK)(?![\w])")
+
+# Pattern kinds. When two sources give the same phrase the lower kind wins.
+TERM, OVERRIDE, COUNTRY, CITY = 1, 2, 3, 4
+_CURATED = frozenset((TERM, OVERRIDE))
+
+INDEX_VERSION = 1
+
+_MAGIC = b"GZIX"
+_NONE = 0xFFFFFFFF
+_SECTIONS = ("root_next", "edge_start", "edge_tok", "edge_to", "fail", "dict_link", "depth", "value")
+
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+
+def _dist_version(name):
+    if find_spec(name) is None:
+        return None
+    try:
+        return metadata.version(name)
+    except Exception:
+        return "?"
+
+
+def _signature():
+    """Identifies the sources an index was compiled from; a change rebuilds it."""
+    terms = json.dumps([sorted(COUNTRY_TERMS.items()), sorted(OVERRIDES.items(), key=str)])
+    return "|".join(
+        [
+            f"v{INDEX_VERSION}",
+            sys.byteorder,
+            f"terms:{zlib.crc32(terms.encode()):08x}",
+            f"geonamescache:{_dist_version('geonamescache')}",
+            f"pycountry:{_dist_version('pycountry')}",
+        ]
+    )
+
+
+def _iter_patterns():
+    """(name, ISO2 or None, kind) from every source, highest priority first."""
+    for iso2, names in COUNTRY_TERMS.items():
+        for name in names:
+            yield name, iso2, TERM
+    for name, iso2 in OVERRIDES.items():
+        yield name, iso2, OVERRIDE
+
+    if find_spec("pycountry") is not None:
+        import pycountry
+
+        for c in pycountry.countries:
+            for attr in ("name", "common_name", "official_name"):
+                name = getattr(c, attr, None)
+                if name:
+                    yield name, c.alpha_2, COUNTRY
+
+    if find_spec("geonamescache") is not None:
+        import geonamescache
+
+        gc = geonamescache.GeonamesCache()
+        for iso2, c in gc.get_countries().items():
+            yield c.get("name"), iso2, COUNTRY
+        for c in gc.get_cities().values():
+            yield c.get("name"), c.get("countrycode"), CITY
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def compile_index():
+    """
+    Compiles every pattern into a word-level Aho-Corasick automaton and returns
+    the index file contents: a JSON header followed by the vocabulary and
+    flat uint32 arrays, so loading is an mmap plus one vocabulary dict.
+    """
+    patterns = {}
+    for name, iso2, kind in _iter_patterns():
+        toks = tuple(normalize_name(name).split())
+        if iso2 is not None and not re.fullmatch(r"[A-Z]{2}", str(iso2)):
+            continue
+        if toks:
+            patterns.setdefault(toks, (iso2, kind))
+
+    vocab = sorted({t for toks in patterns for t in toks})
+    tok_id = {t: i for i, t in enumerate(vocab)}
+    isos = sorted({iso2 for iso2, _ in patterns.values() if iso2})
+    iso_id = {c: i + 1 for i, c in enumerate(isos)}
+
+    children, value, depth = [{}], [0], [0]
+    for toks, (iso2, kind) in patterns.items():
+        s = 0
+        for t in toks:
+            nxt = children[s].get(tok_id[t])
+            if nxt is None:
+                nxt = len(children)
+                children.append({})
+                value.append(0)
+                depth.append(depth[s] + 1)
+                children[s][tok_id[t]] = nxt
+            s = nxt
+        value[s] = (kind << 16) | iso_id.get(iso2, 0)
+
+    n = len(children)
+    fail, dict_link = [0] * n, [_NONE] * n
+    queue = deque(children[0].values())
+    while queue:
+        r = queue.popleft()
+        for tid, s in children[r].items():
+            queue.append(s)
+            f = fail[r]
+            while f and tid not in children[f]:
+                f = fail[f]
+            fail[s] = children[f].get(tid, 0)
+            dict_link[s] = fail[s] if value[fail[s]] else dict_link[fail[s]]
+
+    arrays = {
+        "root_next": array("I", [0] * len(vocab)),
+        "edge_start": array("I"),
+        "edge_tok": array("I"),
+        "edge_to": array("I"),
+        "fail": array("I", fail),
+        "dict_link": array("I", dict_link),
+        "depth": array("I", depth),
+        "value": array("I", value),
+    }
+    for tid, s in children[0].items():
+        arrays["root_next"][tid] = s
+    for kids in children:
+        arrays["edge_start"].append(len(arrays["edge_tok"]))
+        for tid in sorted(kids):
+            arrays["edge_tok"].append(tid)
+            arrays["edge_to"].append(kids[tid])
+    arrays["edge_start"].append(len(arrays["edge_tok"]))
+
+    blobs = [("vocab", "\n".join(vocab).encode("utf-8"), None)]
+    blobs += [(name, arrays[name].tobytes(), len(arrays[name])) for name in _SECTIONS]
+    sections, offset = {}, 0
+    for name, blob, count in blobs:
+        sections[name] = [offset, count if count is not None else len(blob)]
+        offset = _align(offset + len(blob))
+
+    header = json.dumps(
+        {
+            "signature": _signature(),
+            "isos": isos,
+            "patterns": len(patterns),
+            "states": n,
+            "sections": sections,
+        }
+    ).encode("utf-8")
+    out = bytearray(_MAGIC + struct.pack("<I", len(header)) + header)
+    out += bytes(_align(len(out)) - len(out))
+    for name, blob, _count in blobs:
+        out += blob
+        out += bytes(_align(len(blob)) - len(blob))
+    return bytes(out)
+
+
+class GazetteerIndex:
+    """A compiled index, read through a memory map (nothing is copied but the vocabulary)."""
+
+    def __init__(self, buf):
+        self._buf = buf
+        if bytes(buf[:4]) != _MAGIC:
+            raise ValueError("not a gazetteer index")
+        (hlen,) = struct.unpack_from("<I", buf, 4)
+        self.header = json.loads(bytes(buf[8 : 8 + hlen]))
+        base = _align(8 + hlen)
+        view = memoryview(buf)
+
+        off, size = self.header["sections"]["vocab"]
+        words = bytes(view[base + off : base + off + size]).decode("utf-8")
+        self.vocab = {t: i for i, t in enumerate(words.split("\n"))} if words else {}
+        for name in _SECTIONS:
+            off, count = self.header["sections"][name]
+            setattr(self, name, view[base + off : base + off + 4 * count].cast("I"))
+        self.isos = self.header["isos"]
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _goto(self, s, tid):
+        lo, hi = self.edge_start[s], self.edge_start[s + 1]
+        j = bisect_left(self.edge_tok, tid, lo, hi)
+        if j < hi and self.edge_tok[j] == tid:
+            return self.edge_to[j]
+        return _NONE
+
+    def scan(self, toks):
+        """
+        Every pattern occurrence in a token list, in one pass:
+        [(start, end, ISO2 or None, kind)].
+        """
+        vocab, root_next, fail = self.vocab, self.root_next, self.fail
+        value, depth, dict_link = self.value, self.depth, self.dict_link
+        out = []
+        s = 0
+        for i, tok in enumerate(toks):
+            tid = vocab.get(tok)
+            if tid is None:
+                s = 0
+                continue
+            while s:
+                nxt = self._goto(s, tid)
+                if nxt != _NONE:
+                    s = nxt
+                    break
+                s = fail[s]
+            else:
+                s = root_next[tid]
+
+            o = s if value[s] else dict_link[s]
+            while o != _NONE:
+                v = value[o]
+                iso = v & 0xFFFF
+                out.append((i + 1 - depth[o], i + 1, self.isos[iso - 1] if iso else None, v >> 16))
+                o = dict_link[o]
+        return out
+
+
+def write_index(path):
+    data = compile_index()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return data
+
+
+def _load_index():
+    path = config.resolve_path(config.GAZETTEER_FILE)
+    sig = _signature()
+    try:
+        idx = GazetteerIndex.open(path)
+        if idx.header.get("signature") == sig:
+            return idx
+    except (OSError, ValueError):
+        pass
+
+    try:
+        write_index(path)
+        return GazetteerIndex.open(path)
+    except OSError:
+        # Read-only directory: keep the compiled index in anonymous memory.
+        data = compile_index()
+        buf = mmap.mmap(-1, len(data))
+        buf.write(data)
+        return GazetteerIndex(buf)
+
+
+def get_index():
+    """The process-wide index, compiled to GAZETTEER_FILE on first use if missing or stale."""
+    global _INDEX
+    if _INDEX is None:
+        with _INDEX_LOCK:
+            if _INDEX is None:
+                _INDEX = _load_index()
+    return _INDEX
+
+
+def _leftmost_longest(matches):
+    """Non-overlapping matches, preferring the earliest and then the longest."""
+    pos = 0
+    for m in sorted(matches, key=lambda m: (m[0], -m[1])):
+        if m[0] >= pos:
+            yield m
+            pos = m[1]
+
+
+def countries_in_text(text):
+    """
+    ISO2 codes of every country name, demonym or abbreviation in `text`,
+    longest phrase first (so "northern irish" is GB, not IE). Terms used
+    as a language ("Spanish-language") do not count.
+    """
+    found = set()
+    for m in _ABBREV_RE.finditer(text):
+        found.add(ABBREVIATIONS[m.group(1)])
+
+    toks = normalize_name(text).split()
+    matches = [m for m in get_index().scan(toks) if m[3] in _CURATED]
+    for _start, end, iso2, _kind in _leftmost_longest(matches):
+        if iso2 and not (end < len(toks) and toks[end] in LANGUAGE_WORDS):
+            found.add(iso2)
+    return found
+
+
+def lookup_country(text):
+    """The one country `text` names, or None when it names none or several."""
+    found = countries_in_text(text)
+    if len(found) == 1:
+        return next(iter(found))
+    return None
+
+
+def _whole_phrase_iso2(toks):
+    for start, end, iso2, _kind in get_index().scan(toks):
+        if start == 0 and end == len(toks):
+            return iso2
+    return None
+
+
+def lookup_place(text):
+    """
+    Country of a place phrase ("Atlanta", "Rio de Janeiro"): the country or
+    city entry the whole phrase names. "City, region" phrases count when
+    every part names the same country ("Paris, France"). A name that only
+    occurs inside the phrase ("York" in "New York") never does.
+    """
+    parts = [normalize_name(p).split() for p in str(text).split(",")]
+    parts = [toks for toks in parts if toks]
+    if not parts:
+        return None
+    found = {_whole_phrase_iso2(toks) for toks in parts}
+    if len(found) == 1:
+        return found.pop()
+    return None
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else config.resolve_path(config.GAZETTEER_FILE)
+    data = write_index(path)
+    idx = GazetteerIndex.open(path)
+    print(
+        f"{path}: {idx.header['patterns']} patterns, {idx.header['states']} states, "
+        f"{len(idx.vocab)} words, {len(data) / 1024:.0f} KiB"
+    )
@@ -1,52 +1,86 @@
+import time
+
+import run_metrics
 from spotify_client import get_spotify_client
 
 
-def get_unique_artists_from_playlist(playlist_url, max_tracks=None):
+def playlist_id_from_url(playlist_url):
+    if "playlist/" in playlist_url:
+        return playlist_url.split("playlist/")[-1].split("?")[0]
+    return playlist_url
+
+
+def _artist_link(sp, artist):
+    link = (artist.get("external_urls") or {}).get("spotify")
+    if link:
+        return link
+
+    t0 = time.perf_counter()
+    artist_info = sp.artist(artist["id"])
+    run_metrics.record_request("spotify", time.perf_counter() - t0)
+    return artist_info["external_urls"]["spotify"]
+
+
+def iter_playlist_artists(playlist_url, max_tracks=None):
     """
-    Fetches unique artists from a Spotify playlist.
-    For tracks with multiple artists, only takes the FIRST artist.
-    Returns list of dicts with 'artist_name' and 'spotify_link'.
+    Yields each newly seen artist of a Spotify playlist as soon as the page
+    containing it arrives. For tracks with multiple artists, only takes the
+    FIRST artist. Yields dicts with 'artist_name' and 'spotify_link'.
     """
     sp = get_spotify_client()
     if not sp:
         raise RuntimeError("Spotify client is not initialized")
 
-    if "playlist/" in playlist_url:
-        playlist_uri = playlist_url.split("playlist/")[-1].split("?")[0]
-    else:
-        playlist_uri = playlist_url
+    playlist_uri = playlist_id_from_url(playlist_url)
 
     print("Fetching data for playlist...")
 
-    results = sp.playlist_tracks(playlist_uri)
-    tracks = results["items"]
+    seen = set()
+    n_tracks = 0
 
-    while results["next"] and (max_tracks is None or len(tracks) < max_tracks):
-        results = sp.next(results)
-        tracks.extend(results["items"])
+    t0 = time.perf_counter()
+    results = sp.playlist_tracks(playlist_uri)
+    run_metrics.record_request("spotify", time.perf_counter() - t0)
 
-    if max_tracks:
-        tracks = tracks[:max_tracks]
+    while True:
+        for item in results["items"]:
+            if max_tracks is not None and n_tracks >= max_tracks:
+                return
+            n_tracks += 1
 
-    unique_artists = {}
+            track = item.get("track")
+            if not track or not track["artists"]:
+                continue
 
-    for item in tracks:
-        track = item.get("track")
-        if track and track["artists"]:
             artist = track["artists"][0]
             artist_id = artist["id"]
-            artist_name = artist["name"]
+            if artist_id in seen:
+                continue
+            seen.add(artist_id)
+
+            yield {
+                "artist_name": artist["name"],
+                "spotify_link": _artist_link(sp, artist),
+            }
+
+        if not results["next"] or (max_tracks is not None and n_tracks >= max_tracks):
+            return
+
+        t0 = time.perf_counter()
+        results = sp.next(results)
+        run_metrics.record_request("spotify", time.perf_counter() - t0)
+
 
-            if artist_id not in unique_artists:
-                artist_info = sp.artist(artist_id)
-                unique_artists[artist_id] = {
-                    "artist_name": artist_name,
-                    "spotify_link": artist_info["external_urls"]["spotify"],
-                }
+def get_unique_artists_from_playlist(playlist_url, max_tracks=None):
+    """
+    Fetches unique artists from a Spotify playlist.
+    For tracks with multiple artists, only takes the FIRST artist.
+    Returns list of dicts with 'artist_name' and 'spotify_link'.
+    """
+    artists_list = list(iter_playlist_artists(playlist_url, max_tracks=max_tracks))
 
-    print(f"Found {len(unique_artists)} unique artists (first artist per track only)")
+    print(f"Found {len(artists_list)} unique artists (first artist per track only)")
 
-    artists_list = list(unique_artists.values())
     artists_list.sort(key=lambda x: x["artist_name"].lower())
 
     return artists_list
@@ -1,12 +1,72 @@
+import argparse
 import os
+import sys
+import time
 
 import config
-from get_mbid_country import check_dependencies, build_countries_csv
 
+# Each command imports only what it needs: `map` and `cache` never load the
+# resolver (spotipy, requests, NLP backends).
+
+
+def main_batch(playlist_urls):
+    from get_mbid_country import build_countries_csv_batch, check_dependencies
+
+    output_dir = config.resolve_path(config.BATCH_OUTPUT_DIR)
+
+    if not check_dependencies():
+        raise SystemExit(1)
+
+    outputs = build_countries_csv_batch(playlist_urls, output_dir)
+    if not outputs:
+        return
+
+    from get_map import build_map
+
+    for csv_path in outputs.values():
+        playlist_id = os.path.basename(csv_path)[len("countries_") : -len(".csv")]
+        map_output_path = os.path.join(output_dir, f"artists_map_{playlist_id}.html")
+        build_map(csv_path, map_output_path)
+
+
+def main_dry_run():
+    from get_mbid_country import batch_csv_path, estimate_countries_csv
+
+    if config.PLAYLIST_URLS:
+        output_dir = config.resolve_path(config.BATCH_OUTPUT_DIR)
+        targets = [(url, batch_csv_path(output_dir, url)) for url in config.PLAYLIST_URLS]
+    else:
+        targets = [(config.PLAYLIST_URL, config.resolve_path(config.OUTPUT_CSV))]
+
+    for playlist_url, csv_path in targets:
+        estimate_countries_csv(playlist_url, csv_path)
 
-def main():
-    run_dir = os.getcwd()
-    config.set_base_dir(run_dir)
+
+def main_offline():
+    from get_mbid_country import batch_csv_path, build_countries_csv_offline
+
+    if config.PLAYLIST_URLS:
+        output_dir = config.resolve_path(config.BATCH_OUTPUT_DIR)
+        csv_paths = [batch_csv_path(output_dir, url) for url in config.PLAYLIST_URLS]
+    else:
+        csv_paths = [config.resolve_path(config.OUTPUT_CSV)]
+
+    for csv_path in csv_paths:
+        build_countries_csv_offline(csv_path)
+
+
+def main_from_config():
+    if config.DRY_RUN:
+        main_dry_run()
+        return
+
+    if config.OFFLINE:
+        main_offline()
+        return
+
+    if config.PLAYLIST_URLS:
+        main_batch(config.PLAYLIST_URLS)
+        return
 
     csv_path = config.resolve_path(config.OUTPUT_CSV)
     map_output_path = config.resolve_path("artists_map_dashboard_dark.html")
@@ -18,6 +78,8 @@ def main():
         build_map(csv_path, map_output_path)
         return
 
+    from get_mbid_country import build_countries_csv, check_dependencies
+
     if not check_dependencies():
         raise SystemExit(1)
 
@@ -30,5 +92,108 @@ def main():
     build_map(csv_path, map_output_path)
 
 
+def cmd_resolve(args):
+    csv_path = config.resolve_path(args.output or config.OUTPUT_CSV)
+    playlist_url = args.playlist or config.PLAYLIST_URL
+
+    if args.dry_run:
+        from get_mbid_country import estimate_countries_csv
+
+        estimate_countries_csv(playlist_url, csv_path)
+        return
+
+    if args.offline:
+        from get_mbid_country import build_countries_csv_offline
+
+        build_countries_csv_offline(csv_path)
+        return
+
+    from get_mbid_country import build_countries_csv, check_dependencies
+
+    if not check_dependencies():
+        raise SystemExit(1)
+    build_countries_csv(playlist_url, csv_path)
+
+
+def cmd_map(args):
+    csv_path = config.resolve_path(args.csv or config.OUTPUT_CSV)
+    map_output_path = config.resolve_path(args.output or "artists_map_dashboard_dark.html")
+    if not os.path.exists(csv_path):
+        print(f"No CSV at {csv_path}. Run `python main.py resolve` first.")
+        raise SystemExit(1)
+
+    from get_map import build_map
+
+    build_map(csv_path, map_output_path)
+
+
+def cmd_cache_stats(args):
+    import sqlite_cache
+
+    st = sqlite_cache.stats()
+    if args.json:
+        import json
+
+        print(json.dumps(st, indent=2, sort_keys=True))
+        return
+
+    print(f"{st['path']}: {st['rows']} rows, {st['file_bytes'] / 1e6:.1f} MB on disk")
+    print(f"  {'family':<28} {'rows':>8} {'MB':>8}  newest")
+    for name, fam in sorted(st["families"].items(), key=lambda kv: kv[1]["rows"], reverse=True):
+        newest = time.strftime("%Y-%m-%d %H:%M", time.localtime(fam["newest"])) if fam["newest"] else "-"
+        print(f"  {name:<28} {fam['rows']:>8} {fam['bytes'] / 1e6:>8.2f}  {newest}")
+
+
+def cmd_cache_export(args):
+    import sqlite_cache
+
+    if args.output in (None, "-"):
+        n = sqlite_cache.export(sys.stdout, prefix=args.prefix)
+    else:
+        with open(config.resolve_path(args.output), "w", encoding="utf-8") as f:
+            n = sqlite_cache.export(f, prefix=args.prefix)
+    print(f"Exported {n} cache rows.", file=sys.stderr)
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(description="Spotify artist -> MusicBrainz ID -> country. No command: run as set in config.py.")
+    sub = ap.add_subparsers(dest="command")
+
+    p = sub.add_parser("resolve", help="resolve a playlist's artists into a CSV")
+    p.add_argument("playlist", nargs="?", help="playlist link (default: config.PLAYLIST_URL)")
+    p.add_argument("-o", "--output", help="CSV path (default: config.OUTPUT_CSV)")
+    p.add_argument("--dry-run", action="store_true", help="estimate requests and time only")
+    p.add_argument("--offline", action="store_true", help="re-resolve the existing CSV from the cache only")
+    p.set_defaults(func=cmd_resolve)
+
+    p = sub.add_parser("map", help="build the HTML map from an existing CSV")
+    p.add_argument("--csv", help="input CSV (default: config.OUTPUT_CSV)")
+    p.add_argument("-o", "--output", help="HTML path (default: artists_map_dashboard_dark.html)")
+    p.set_defaults(func=cmd_map)
+
+    p = sub.add_parser("cache", help="inspect the SQLite cache")
+    cache_sub = p.add_subparsers(dest="cache_command", required=True)
+    c = cache_sub.add_parser("stats", help="rows and sizes per cache family")
+    c.add_argument("--json", action="store_true")
+    c.set_defaults(func=cmd_cache_stats)
+    c = cache_sub.add_parser("export", help="dump cache rows as JSON lines")
+    c.add_argument("--prefix", default="", help="only keys starting with this, e.g. country_v8_json_")
+    c.add_argument("-o", "--output", help="output file (default: stdout)")
+    c.set_defaults(func=cmd_cache_export)
+
+    return ap
+
+
+def main(argv=None):
+    run_dir = os.getcwd()
+    config.set_base_dir(run_dir)
+
+    args = build_parser().parse_args(argv)
+    if args.command is None:
+        main_from_config()
+        return
+    args.func(args)
+
+
 if __name__ == "__main__":
     main()
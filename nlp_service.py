@@ -0,0 +1,171 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import config
+
+KINDS = ("country", "language")
+
+# Settings that shape the models; spawned workers re-import config.py.
+_MODEL_SETTINGS = ("LINGUA_LANGUAGES", "LINGUA_LOW_ACCURACY", "NLP_PRELOAD")
+
+
+def _worker_init(base_dir, settings=None):
+    # Runs once per worker process: models are loaded here, not per batch.
+    config.set_base_dir(base_dir)
+    config.NLP_PROCESS_WORKERS = 0
+    for k, v in (settings or {}).items():
+        setattr(config, k, v)
+    import get_mbid_country as g
+
+    if config.NLP_PRELOAD:
+        g.preload_nlp()
+    else:
+        g._get_spacy_nlp()
+
+
+def _worker_run_batch(kind, texts):
+    import get_mbid_country as g
+
+    if kind == "country":
+        return g._infer_countries_uncached(texts)
+    if kind == "language":
+        return g.detect_languages(texts)
+    raise ValueError(f"unknown NLP task kind: {kind}")
+
+
+class NLPService:
+    """
+    CPU-bound NLP (spaCy country inference, lingua language detection) in a
+    process pool. Texts submitted from any thread are collected into batches
+    per task kind and answered through futures.
+    """
+
+    def __init__(self, processes, batch_size=32, max_wait_seconds=0.01):
+        ctx = multiprocessing.get_context("spawn")
+        self._pool = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=ctx,
+            initializer=_worker_init,
+            initargs=(config.BASE_DIR, {k: getattr(config, k) for k in _MODEL_SETTINGS}),
+        )
+        self._batch_size = max(1, int(batch_size))
+        self._max_wait = max(0.0, float(max_wait_seconds))
+
+        self._cond = threading.Condition()
+        self._pending = {k: [] for k in KINDS}
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._dispatch, name="nlp-dispatch", daemon=True)
+        self._thread.start()
+
+    def submit(self, kind, text):
+        if kind not in self._pending:
+            raise ValueError(f"unknown NLP task kind: {kind}")
+        fut = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("NLP service is shut down")
+            self._pending[kind].append((text, fut))
+            self._cond.notify()
+        return fut
+
+    def infer_country(self, text):
+        return self.submit("country", text)
+
+    def detect_language(self, text):
+        return self.submit("language", text)
+
+    def map(self, kind, texts):
+        futures = [self.submit(kind, t) for t in texts]
+        return [f.result() for f in futures]
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=5.0)
+        self._pool.shutdown(wait=True)
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._closed and not any(self._pending.values()):
+                self._cond.wait()
+            if not any(self._pending.values()):
+                return None, None
+
+            # Give concurrent submitters a moment to fill the batch.
+            deadline = time.monotonic() + self._max_wait
+            while not self._closed:
+                if max(len(v) for v in self._pending.values()) >= self._batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            kind = max(KINDS, key=lambda k: len(self._pending[k]))
+            batch = self._pending[kind][: self._batch_size]
+            del self._pending[kind][: self._batch_size]
+            return kind, batch
+
+    def _dispatch(self):
+        while True:
+            kind, batch = self._take_batch()
+            if batch is None:
+                return
+
+            by_text = {}
+            for text, fut in batch:
+                by_text.setdefault(text, []).append(fut)
+            texts = list(by_text.keys())
+
+            try:
+                pool_fut = self._pool.submit(_worker_run_batch, kind, texts)
+            except Exception as e:
+                for futs in by_text.values():
+                    for f in futs:
+                        f.set_exception(e)
+                continue
+
+            def _deliver(pf, texts=texts, by_text=by_text):
+                try:
+                    values = pf.result()
+                except Exception as e:
+                    for futs in by_text.values():
+                        for f in futs:
+                            f.set_exception(e)
+                    return
+                for t, v in zip(texts, values):
+                    for f in by_text[t]:
+                        f.set_result(v)
+
+            pool_fut.add_done_callback(_deliver)
+
+
+_SERVICE = None
+_SERVICE_LOCK = threading.Lock()
+
+
+def get_nlp_service():
+    """Shared NLPService, or None when NLP_PROCESS_WORKERS is 0."""
+    global _SERVICE
+    if config.NLP_PROCESS_WORKERS <= 0:
+        return None
+    with _SERVICE_LOCK:
+        if _SERVICE is None:
+            _SERVICE = NLPService(
+                config.NLP_PROCESS_WORKERS,
+                batch_size=config.NLP_BATCH_SIZE,
+                max_wait_seconds=config.NLP_BATCH_WAIT_SECONDS,
+            )
+        return _SERVICE
+
+
+def shutdown_nlp_service():
+    global _SERVICE
+    with _SERVICE_LOCK:
+        svc, _SERVICE = _SERVICE, None
+    if svc is not None:
+        svc.shutdown()
@@ -0,0 +1,148 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+import config
+
+# Names, aliases and track titles repeat constantly across candidates and
+# ladder steps, so every normalizer below is memoized on the input string.
+_MEMO = lru_cache(maxsize=config.NORMALIZE_MEMO_SIZE)
+
+_NULLS = frozenset(["none", "null", "nan", "na", ""])
+
+_DROP_APOSTROPHES = str.maketrans("", "", "’'`")
+_FULLWIDTH_PLUS = str.maketrans({"＋": "+"})
+
+_WS_RUN = re.compile(r"\s+")
+_NON_ALNUM_RUN = re.compile(r"[^a-z0-9]+")
+_NON_ALNUM_PLUS_RUN = re.compile(r"[^a-z0-9+]+")
+_BRACKETED = re.compile(r"\(.*?\)|\[.*?\]|\{.*?\}")
+_TITLE_NOISE = re.compile(r"\b(remaster(ed)?|live|edit|version|mono|stereo|deluxe|feat\.?|ft\.?)\b")
+
+_NUM_WORDS = {
+    "zero": "0",
+    "one": "1",
+    "two": "2",
+    "three": "3",
+    "four": "4",
+    "five": "5",
+    "six": "6",
+    "seven": "7",
+    "eight": "8",
+    "nine": "9",
+    "ten": "10",
+    "eleven": "11",
+    "twelve": "12",
+}
+
+
+def _fold(s):
+    """NFKD without combining marks, lowercased. ASCII input skips Unicode work."""
+    if not s.isascii():
+        s = unicodedata.normalize("NFKD", s)
+        s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return s.lower()
+
+
+def clean_text(text):
+    if text is None:
+        return "None"
+    if isinstance(text, float):
+        if text != text:
+            return "None"
+        return str(text)
+    return _clean_str(str(text))
+
+
+@_MEMO
+def _clean_str(text):
+    if not text or text.isspace():
+        return "None"
+    if text.strip().lower() in _NULLS:
+        return "None"
+
+    try:
+        text = unicodedata.normalize("NFKC", text)
+    except Exception:
+        pass
+
+    return " ".join(text.split())
+
+
+def normalize_name(s):
+    if s is None:
+        return ""
+    return _normalize_name(str(s))
+
+
+@_MEMO
+def _normalize_name(s):
+    s = _fold(s).translate(_DROP_APOSTROPHES)
+    return _NON_ALNUM_RUN.sub(" ", s).strip()
+
+
+@_MEMO
+def name_tokens(s):
+    """frozenset of normalize_name tokens."""
+    return frozenset(normalize_name(s).split())
+
+
+def normalize_name_strict(s):
+    if s is None:
+        return ""
+    return _normalize_name_strict(str(s))
+
+
+@_MEMO
+def _normalize_name_strict(s):
+    s = _fold(s).translate(_FULLWIDTH_PLUS).translate(_DROP_APOSTROPHES)
+    return _NON_ALNUM_PLUS_RUN.sub(" ", s).strip()
+
+
+@_MEMO
+def strict_tokens(s):
+    """normalize_name_strict tokens with number words as digits, as a tuple."""
+    return tuple(_NUM_WORDS.get(t, t) for t in normalize_name_strict(s).split())
+
+
+def normalize_track_title(s):
+    return _normalize_track_title(clean_text(s))
+
+
+@_MEMO
+def _normalize_track_title(s):
+    s = _fold(s).strip()
+    s = _BRACKETED.sub(" ", s)
+    s = _TITLE_NOISE.sub(" ", s)
+    s = s.translate(_DROP_APOSTROPHES)
+    return _NON_ALNUM_RUN.sub(" ", s).strip()
+
+
+def normalize_text_simple(s):
+    return _normalize_text_simple(str(s))
+
+
+@_MEMO
+def _normalize_text_simple(s):
+    return _WS_RUN.sub(" ", _fold(s).strip())
+
+
+_MEMOIZED = (
+    _clean_str,
+    _normalize_name,
+    name_tokens,
+    _normalize_name_strict,
+    strict_tokens,
+    _normalize_track_title,
+    _normalize_text_simple,
+)
+
+
+def cache_info():
+    """Memo statistics per normalizer, for benchmarks."""
+    return {f.__name__.lstrip("_"): f.cache_info() for f in _MEMOIZED}
+
+
+def cache_clear():
+    for f in _MEMOIZED:
+        f.cache_clear()
@@ -0,0 +1,215 @@
+import queue
+import threading
+import time
+
+_END = object()
+
+
+class _StageFailure:
+    def __init__(self, stage_name, exc):
+        self.stage_name = stage_name
+        self.exc = exc
+
+
+class Stage:
+    """
+    One lane of a StagedPipeline.
+    `handler(item)` returns `(next_stage_name, item)`; a next stage of None
+    marks the item as finished and hands it to `StagedPipeline.results()`.
+    """
+
+    def __init__(self, name, handler, workers=1, queue_size=32):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, int(workers))
+
+        # Items coming from upstream wait in a bounded inbox (backpressure);
+        # items routed back from a downstream stage go to an unbounded backlog
+        # that is drained first, so feedback can never deadlock the pipeline.
+        self.inbox = queue.Queue(maxsize=max(1, int(queue_size)))
+        self.backlog = queue.Queue()
+
+        self.lock = threading.Lock()
+        self.busy = 0
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self.depth_max = 0
+        self.depth_sum = 0
+        self.depth_samples = 0
+
+    def depth(self):
+        return self.inbox.qsize() + self.backlog.qsize()
+
+    def _sample_depth(self):
+        d = self.depth()
+        with self.lock:
+            self.depth_samples += 1
+            self.depth_sum += d
+            if d > self.depth_max:
+                self.depth_max = d
+
+
+class StagedPipeline:
+    """
+    Runs items through a fixed sequence of stages, each with its own thread
+    pool and bounded input queue. Items may skip ahead or be routed back to
+    an earlier stage.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        self._by_name = {s.name: s for s in self.stages}
+        self._order = {s.name: i for i, s in enumerate(self.stages)}
+
+        self._output = queue.Queue()
+        self._state_lock = threading.Lock()
+        self._in_flight = 0
+        self._closed = False
+        self._stop = threading.Event()
+        self._threads = []
+        self._started_at = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+        return False
+
+    def start(self):
+        if self._threads:
+            return
+        self._started_at = time.time()
+        for stage in self.stages:
+            for i in range(stage.workers):
+                t = threading.Thread(
+                    target=self._run_stage,
+                    args=(stage,),
+                    name=f"{stage.name}-{i}",
+                    daemon=True,
+                )
+                t.start()
+                self._threads.append(t)
+
+    def shutdown(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=1.0)
+        self._threads = []
+
+    def submit(self, item, stage=None):
+        """Blocks while the target stage's inbox is full."""
+        target = self._by_name[stage] if stage else self.stages[0]
+        with self._state_lock:
+            if self._closed:
+                raise RuntimeError("pipeline is closed")
+            self._in_flight += 1
+        self._put(target.inbox, item)
+
+    def put_result(self, item):
+        """Hands an already finished item straight to results()."""
+        with self._state_lock:
+            if self._closed:
+                raise RuntimeError("pipeline is closed")
+            self._in_flight += 1
+        self._finish(item)
+
+    def close(self):
+        """No more submissions; results() ends once in-flight items drain."""
+        with self._state_lock:
+            self._closed = True
+            done = self._in_flight == 0
+        if done:
+            self._output.put(_END)
+
+    def results(self):
+        while True:
+            item = self._output.get()
+            if item is _END:
+                return
+            if isinstance(item, _StageFailure):
+                raise item.exc
+            yield item
+
+    def in_flight(self):
+        with self._state_lock:
+            return self._in_flight
+
+    def metrics(self):
+        elapsed = max(1e-9, time.time() - (self._started_at or time.time()))
+        out = {}
+        for s in self.stages:
+            with s.lock:
+                out[s.name] = {
+                    "workers": s.workers,
+                    "queued": s.depth(),
+                    "busy": s.busy,
+                    "processed": s.processed,
+                    "max_depth": s.depth_max,
+                    "avg_depth": (s.depth_sum / s.depth_samples) if s.depth_samples else 0.0,
+                    "utilization": s.busy_seconds / (s.workers * elapsed),
+                }
+        return out
+
+    def format_depths(self):
+        return " ".join(f"{s.name}={s.depth()}/{s.busy}" for s in self.stages)
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _next_item(self, stage):
+        while not self._stop.is_set():
+            try:
+                item = stage.backlog.get_nowait()
+            except queue.Empty:
+                try:
+                    item = stage.inbox.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            stage._sample_depth()
+            return item
+        return _END
+
+    def _finish(self, item):
+        self._output.put(item)
+        with self._state_lock:
+            self._in_flight -= 1
+            done = self._closed and self._in_flight == 0
+        if done:
+            self._output.put(_END)
+
+    def _run_stage(self, stage):
+        while True:
+            item = self._next_item(stage)
+            if item is _END:
+                return
+
+            with stage.lock:
+                stage.busy += 1
+            t0 = time.perf_counter()
+            try:
+                route, out = stage.handler(item)
+            except Exception as e:
+                route, out = None, _StageFailure(stage.name, e)
+            finally:
+                dt = time.perf_counter() - t0
+                with stage.lock:
+                    stage.busy -= 1
+                    stage.processed += 1
+                    stage.busy_seconds += dt
+
+            if route is None:
+                self._finish(out)
+                continue
+
+            target = self._by_name[route]
+            if self._order[route] <= self._order[stage.name]:
+                target.backlog.put(out)
+            else:
+                self._put(target.inbox, out)
@@ -0,0 +1,247 @@
+import json
+import os
+import threading
+import time
+
+# Cache key families, longest prefix first wins (see cache_family).
+CACHE_FAMILIES = (
+    "spotify_artist_meta",
+    "spotify_tracks_detailed",
+    "mbid_spotify",
+    "listenbrainz_simple",
+    "mb_search_artist_paged",
+    "mb_artist_urlrels",
+    "mb_rec_title_match",
+    "mb_rec_isrc_match",
+    "mb_artist_recordings",
+    "mb_exact_name",
+    "country_v8_json",
+    "text_iso2",
+    "track_lang",
+    "translate",
+    "artist_index",
+)
+
+STEPS = ("spotify", "16a", "16b", "16c", "16d", "16e")
+
+_LOCK = threading.Lock()
+_LOCAL = threading.local()
+
+
+def _empty_state():
+    return {
+        "started_at": time.time(),
+        "artists": 0,
+        "resolved": 0,
+        "methods": {},
+        "steps": {},
+        "requests": {},
+        "step_requests": {},
+        "rate_limit_wait": {},
+        "cache": {},
+    }
+
+
+_STATE = _empty_state()
+
+
+def reset():
+    global _STATE
+    with _LOCK:
+        _STATE = _empty_state()
+
+
+def cache_family(key):
+    best = None
+    for fam in CACHE_FAMILIES:
+        if key.startswith(fam) and (best is None or len(fam) > len(best)):
+            best = fam
+    return best or "other"
+
+
+def set_step(step):
+    """Marks the step the current thread is working on, for request attribution."""
+    _LOCAL.step = step
+
+
+def current_step():
+    return getattr(_LOCAL, "step", None)
+
+
+def record_step(step, seconds, resolved=False):
+    with _LOCK:
+        st = _STATE["steps"].setdefault(step, {"count": 0, "resolved": 0, "seconds": 0.0, "max_seconds": 0.0})
+        st["count"] += 1
+        st["seconds"] += seconds
+        if resolved:
+            st["resolved"] += 1
+        if seconds > st["max_seconds"]:
+            st["max_seconds"] = seconds
+
+
+def record_request(upstream, seconds, ok=True):
+    step = current_step() or "other"
+    with _LOCK:
+        r = _STATE["requests"].setdefault(upstream, {"count": 0, "errors": 0, "seconds": 0.0})
+        r["count"] += 1
+        r["seconds"] += seconds
+        if not ok:
+            r["errors"] += 1
+        per_step = _STATE["step_requests"].setdefault(step, {})
+        per_step[upstream] = per_step.get(upstream, 0) + 1
+
+
+def record_rate_limit_wait(upstream, seconds):
+    with _LOCK:
+        _STATE["rate_limit_wait"][upstream] = _STATE["rate_limit_wait"].get(upstream, 0.0) + seconds
+
+
+def record_cache(key, hit):
+    fam = cache_family(key)
+    with _LOCK:
+        c = _STATE["cache"].setdefault(fam, {"hits": 0, "misses": 0})
+        c["hits" if hit else "misses"] += 1
+
+
+def record_artist(result):
+    """Counts one finished artist; it is resolved when its result has a country."""
+    result = result or {}
+    with _LOCK:
+        _STATE["artists"] += 1
+        if result.get("country"):
+            _STATE["resolved"] += 1
+        m = result.get("method") or "unknown"
+        _STATE["methods"][m] = _STATE["methods"].get(m, 0) + 1
+
+
+def raw_snapshot():
+    with _LOCK:
+        return json.loads(json.dumps(_STATE))
+
+
+def merge(raw):
+    """Adds another process's raw_snapshot() into this one."""
+
+    def _add(dst, src):
+        for k, v in src.items():
+            if isinstance(v, dict):
+                _add(dst.setdefault(k, {}), v)
+            elif k == "max_seconds":
+                dst[k] = max(dst.get(k, 0.0), v)
+            else:
+                dst[k] = dst.get(k, 0) + v
+
+    with _LOCK:
+        for k in ("steps", "requests", "step_requests", "rate_limit_wait", "cache", "methods"):
+            _add(_STATE[k], raw.get(k, {}))
+
+
+def summary(extra=None):
+    raw = raw_snapshot()
+    finished = time.time()
+    elapsed = max(1e-9, finished - raw["started_at"])
+
+    steps = {}
+    for name, st in raw["steps"].items():
+        steps[name] = dict(st, avg_seconds=st["seconds"] / st["count"] if st["count"] else 0.0)
+
+    cache = {}
+    hits_total = misses_total = 0
+    for fam, c in sorted(raw["cache"].items()):
+        n = c["hits"] + c["misses"]
+        hits_total += c["hits"]
+        misses_total += c["misses"]
+        cache[fam] = dict(c, hit_ratio=(c["hits"] / n) if n else 0.0)
+    n_total = hits_total + misses_total
+    cache["_total"] = {
+        "hits": hits_total,
+        "misses": misses_total,
+        "hit_ratio": (hits_total / n_total) if n_total else 0.0,
+    }
+
+    out = {
+        "started_at": raw["started_at"],
+        "finished_at": finished,
+        "elapsed_seconds": elapsed,
+        "artists": {
+            "processed": raw["artists"],
+            "resolved": raw["resolved"],
+            "per_minute": raw["artists"] / (elapsed / 60.0),
+            "methods": raw["methods"],
+        },
+        "steps": steps,
+        "requests": raw["requests"],
+        "requests_per_step": raw["step_requests"],
+        "rate_limit_wait_seconds": raw["rate_limit_wait"],
+        "cache": cache,
+    }
+    if extra:
+        out.update(extra)
+    return out
+
+
+def _atomic_write(path, text):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def write_json(path, summ):
+    _atomic_write(path, json.dumps(summ, indent=2, sort_keys=True))
+
+
+def write_prometheus(path, summ):
+    """Prometheus node_exporter textfile-collector format."""
+    p = "spotify_mbid_country"
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {p}_{name} {help_text}")
+        lines.append(f"# TYPE {p}_{name} {kind}")
+        for labels, value in samples:
+            lbl = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            lines.append(f"{p}_{name}{{{lbl}}} {value}" if lbl else f"{p}_{name} {value}")
+
+    metric("run_duration_seconds", "gauge", "Wall-clock duration of the last run.", [({}, summ["elapsed_seconds"])])
+    metric("artists_processed", "gauge", "Artists processed in the last run.", [({}, summ["artists"]["processed"])])
+    metric(
+        "artists_resolved", "gauge", "Artists resolved to a country in the last run.",
+        [({}, summ["artists"]["resolved"])],
+    )
+    metric("artists_per_minute", "gauge", "Artist throughput of the last run.", [({}, summ["artists"]["per_minute"])])
+    metric(
+        "step_seconds_total", "gauge", "Time spent per resolution step.",
+        [({"step": k}, v["seconds"]) for k, v in sorted(summ["steps"].items())],
+    )
+    metric(
+        "step_runs", "gauge", "Artists that entered each resolution step.",
+        [({"step": k}, v["count"]) for k, v in sorted(summ["steps"].items())],
+    )
+    metric(
+        "requests", "gauge", "HTTP requests per upstream.",
+        [({"upstream": k}, v["count"]) for k, v in sorted(summ["requests"].items())],
+    )
+    metric(
+        "request_seconds_total", "gauge", "Time spent in HTTP requests per upstream.",
+        [({"upstream": k}, v["seconds"]) for k, v in sorted(summ["requests"].items())],
+    )
+    metric(
+        "rate_limit_wait_seconds_total", "gauge", "Time spent sleeping in the rate limiter.",
+        [({"upstream": k}, v) for k, v in sorted(summ["rate_limit_wait_seconds"].items())],
+    )
+    metric(
+        "cache_hit_ratio", "gauge", "Cache hit ratio per key family.",
+        [({"family": k}, v["hit_ratio"]) for k, v in sorted(summ["cache"].items())],
+    )
+    _atomic_write(path, "\n".join(lines) + "\n")
+
+
+def export(json_path=None, prom_path=None, extra=None):
+    summ = summary(extra)
+    if json_path:
+        write_json(json_path, summ)
+    if prom_path:
+        write_prometheus(prom_path, summ)
+    return summ
@@ -0,0 +1,254 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+
+def _connect(db_path):
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+    except Exception:
+        pass
+    return conn
+
+
+class SharedRateLimiter:
+    """
+    Cross-process rate limiter. Every caller reserves the next free slot for
+    its upstream in an SQLite row (BEGIN IMMEDIATE serializes the update
+    across processes), then sleeps until that slot. Calls are therefore spaced
+    at least `min_interval` apart host-wide, however many processes share the
+    database file.
+    """
+
+    def __init__(self, db_path):
+        self._conn = _connect(db_path)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                kind TEXT PRIMARY KEY,
+                next_ts REAL NOT NULL
+            );
+            """
+        )
+
+    def acquire(self, kind, min_interval):
+        """Blocks until the caller may issue one request. Returns seconds slept."""
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE;")
+            try:
+                cur.execute("SELECT next_ts FROM rate_limits WHERE kind = ?;", (kind,))
+                row = cur.fetchone()
+                now = time.time()
+                slot = max(now, row[0] if row else 0.0)
+                cur.execute(
+                    "INSERT INTO rate_limits(kind, next_ts) VALUES(?, ?) "
+                    "ON CONFLICT(kind) DO UPDATE SET next_ts = excluded.next_ts;",
+                    (kind, slot + min_interval),
+                )
+                cur.execute("COMMIT;")
+            except Exception:
+                cur.execute("ROLLBACK;")
+                raise
+
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+        return max(0.0, wait)
+
+
+def _finish_empty(cur, idx, attempts):
+    """Marks a work item done with no result after its last failed attempt."""
+    cur.execute("SELECT COALESCE(MAX(done_seq), 0) + 1 FROM work_items;")
+    seq = cur.fetchone()[0]
+    cur.execute(
+        "UPDATE work_items SET status = 'done', result = NULL, done_seq = ?, attempts = ?, "
+        "lease_expires = NULL WHERE idx = ?;",
+        (seq, attempts, idx),
+    )
+
+
+class WorkTable:
+    """
+    Shared work list for multi-process runs. Workers claim one artist at a
+    time under a lease; an expired lease (crashed or stuck worker) makes the
+    item claimable again.
+    """
+
+    def __init__(self, db_path):
+        self._conn = _connect(db_path)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS work_items (
+                idx INTEGER PRIMARY KEY,
+                artist_name TEXT NOT NULL,
+                spotify_link TEXT NOT NULL,
+                status TEXT NOT NULL,
+                owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                done_seq INTEGER,
+                result BLOB
+            );
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS worker_metrics (
+                worker TEXT PRIMARY KEY,
+                snapshot BLOB NOT NULL
+            );
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_work_status ON work_items(status);")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_work_done_seq ON work_items(done_seq);")
+
+    def _tx(self, fn):
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE;")
+            try:
+                out = fn(cur)
+                cur.execute("COMMIT;")
+                return out
+            except Exception:
+                cur.execute("ROLLBACK;")
+                raise
+
+    def reset(self, rows):
+        """rows: iterable of (idx, artist_name, spotify_link)."""
+
+        def _do(cur):
+            cur.execute("DELETE FROM work_items;")
+            cur.execute("DELETE FROM worker_metrics;")
+            cur.executemany(
+                "INSERT INTO work_items(idx, artist_name, spotify_link, status) VALUES(?,?,?,'pending');",
+                list(rows),
+            )
+
+        self._tx(_do)
+
+    def claim(self, owner, lease_seconds, max_attempts):
+        """
+        Leases the next pending item, or one whose lease expired. Taking back an
+        expired lease counts as a failed attempt (its worker died), and after
+        max_attempts such an item is finished with no result, as in release().
+        """
+
+        def _do(cur):
+            now = time.time()
+            while True:
+                cur.execute(
+                    "SELECT idx, artist_name, spotify_link, status, attempts FROM work_items "
+                    "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                    "ORDER BY idx LIMIT 1;",
+                    (now,),
+                )
+                row = cur.fetchone()
+                if not row:
+                    return None
+                idx, artist_name, spotify_link, status, attempts = row
+                if status == "leased":
+                    attempts += 1
+                    if attempts >= max_attempts:
+                        _finish_empty(cur, idx, attempts)
+                        continue
+                cur.execute(
+                    "UPDATE work_items SET status = 'leased', owner = ?, lease_expires = ?, attempts = ? "
+                    "WHERE idx = ?;",
+                    (owner, now + lease_seconds, attempts, idx),
+                )
+                return idx, artist_name, spotify_link
+
+        return self._tx(_do)
+
+    def renew(self, idx, owner, lease_seconds):
+        def _do(cur):
+            cur.execute(
+                "UPDATE work_items SET lease_expires = ? WHERE idx = ? AND owner = ? AND status = 'leased';",
+                (time.time() + lease_seconds, idx, owner),
+            )
+
+        self._tx(_do)
+
+    def complete(self, idx, owner, result):
+        blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+
+        def _do(cur):
+            cur.execute("SELECT COALESCE(MAX(done_seq), 0) + 1 FROM work_items;")
+            seq = cur.fetchone()[0]
+            cur.execute(
+                "UPDATE work_items SET status = 'done', result = ?, done_seq = ?, lease_expires = NULL "
+                "WHERE idx = ? AND owner = ? AND status = 'leased';",
+                (blob, seq, idx, owner),
+            )
+
+        self._tx(_do)
+
+    def release(self, idx, owner, max_attempts):
+        """Gives a failed item back; after max_attempts it is finished with no result."""
+
+        def _do(cur):
+            cur.execute("SELECT attempts FROM work_items WHERE idx = ? AND owner = ?;", (idx, owner))
+            row = cur.fetchone()
+            if not row:
+                return
+            attempts = row[0] + 1
+            if attempts >= max_attempts:
+                _finish_empty(cur, idx, attempts)
+            else:
+                cur.execute(
+                    "UPDATE work_items SET status = 'pending', owner = NULL, lease_expires = NULL, attempts = ? "
+                    "WHERE idx = ?;",
+                    (attempts, idx),
+                )
+
+        self._tx(_do)
+
+    def done_since(self, last_seq):
+        """Returns ([(idx, result), ...], new_last_seq) for items finished after last_seq."""
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute(
+                "SELECT idx, result, done_seq FROM work_items WHERE status = 'done' AND done_seq > ? "
+                "ORDER BY done_seq;",
+                (last_seq,),
+            )
+            rows = cur.fetchall()
+
+        out = []
+        for idx, blob, seq in rows:
+            out.append((idx, pickle.loads(blob) if blob is not None else None))
+            last_seq = seq
+        return out, last_seq
+
+    def remaining(self):
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("SELECT COUNT(*) FROM work_items WHERE status != 'done';")
+            return cur.fetchone()[0]
+
+    def put_metrics(self, worker, snapshot):
+        blob = pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+
+        def _do(cur):
+            cur.execute(
+                "INSERT INTO worker_metrics(worker, snapshot) VALUES(?, ?) "
+                "ON CONFLICT(worker) DO UPDATE SET snapshot = excluded.snapshot;",
+                (worker, blob),
+            )
+
+        self._tx(_do)
+
+    def worker_metrics(self):
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("SELECT snapshot FROM worker_metrics;")
+            return [pickle.loads(b) for (b,) in cur.fetchall()]
@@ -16,8 +16,12 @@ def get_spotify_client():
             client_id=config.SPOTIFY_CLIENT_ID,
             client_secret=config.SPOTIFY_CLIENT_SECRET,
         )
+        if config.SPOTIFY_TOKEN_URL:
+            auth_manager.OAUTH_TOKEN_URL = config.SPOTIFY_TOKEN_URL
         _spotify_client = spotipy.Spotify(auth_manager=auth_manager)
+        if config.SPOTIFY_API_PREFIX:
+            _spotify_client.prefix = config.SPOTIFY_API_PREFIX
     except Exception:
         _spotify_client = None
 
-    return _spotify_client
+    return _spotify_client
@@ -0,0 +1,224 @@
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import config
+import run_metrics
+
+_SQL_CONN = None
+_SQL_LOCK = threading.Lock()
+
+_MEM_CACHE = {}
+_WRITE_BUFFER = {}
+_DIRTY = False
+
+
+def _sql_connect():
+    global _SQL_CONN
+    if _SQL_CONN is not None:
+        return
+    with _SQL_LOCK:
+        if _SQL_CONN is not None:
+            return
+        _SQL_CONN = _sql_open()
+
+
+def _sql_open():
+    # The connection is only published once the table exists; concurrent
+    # first callers wait on _SQL_LOCK in _sql_connect.
+    db_path = config.resolve_path(config.DB_FILE)
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+    cur = conn.cursor()
+
+    try:
+        cur.execute("PRAGMA journal_mode=WAL;")
+        cur.execute("PRAGMA synchronous=NORMAL;")
+        cur.execute("PRAGMA temp_store=MEMORY;")
+    except Exception:
+        pass
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS kv_cache (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_kv_cache_updated ON kv_cache(updated_at);")
+    conn.commit()
+    return conn
+
+
+def _cache_lookup(key):
+    """(found, value) from the write buffer, memory or SQLite, without recording metrics."""
+    if key in _WRITE_BUFFER:
+        return True, _WRITE_BUFFER[key]
+    if key in _MEM_CACHE:
+        return True, _MEM_CACHE[key]
+
+    _sql_connect()
+    with _SQL_LOCK:
+        cur = _SQL_CONN.cursor()
+        cur.execute("SELECT value FROM kv_cache WHERE key = ? LIMIT 1;", (key,))
+        row = cur.fetchone()
+
+    if not row:
+        return False, None
+
+    try:
+        val = pickle.loads(row[0])
+    except Exception:
+        return False, None
+
+    _MEM_CACHE[key] = val
+    return True, val
+
+
+def cache_set(key, value):
+    global _DIRTY
+    _MEM_CACHE[key] = value
+    _WRITE_BUFFER[key] = value
+    _DIRTY = True
+
+
+def flush_cache():
+    global _DIRTY
+    if not _DIRTY or not _WRITE_BUFFER:
+        return
+
+    _sql_connect()
+    now = time.time()
+
+    # popitem() is atomic, so a cache_set racing with the flush is never lost.
+    items = []
+    while True:
+        try:
+            items.append(_WRITE_BUFFER.popitem())
+        except KeyError:
+            break
+
+    payload = []
+    for k, v in items:
+        try:
+            blob = pickle.dumps(v, protocol=pickle.HIGHEST_PROTOCOL)
+            payload.append((k, blob, now))
+        except Exception:
+            continue
+
+    if not payload:
+        _DIRTY = False
+        return
+
+    with _SQL_LOCK:
+        cur = _SQL_CONN.cursor()
+        cur.executemany(
+            "INSERT INTO kv_cache(key, value, updated_at) VALUES(?,?,?) "
+            "ON CONFLICT(key) DO UPDATE SET value=excluded.value, updated_at=excluded.updated_at;",
+            payload,
+        )
+        _SQL_CONN.commit()
+
+    _DIRTY = False
+
+
+def migrate_pickle_cache_to_sqlite(pickle_file):
+    if not os.path.exists(pickle_file):
+        return
+    try:
+        with open(pickle_file, "rb") as f:
+            data = pickle.load(f)
+        if not isinstance(data, dict) or not data:
+            return
+    except Exception:
+        return
+
+    _sql_connect()
+    with _SQL_LOCK:
+        cur = _SQL_CONN.cursor()
+        existing = set()
+        cur.execute("SELECT key FROM kv_cache;")
+        for (k,) in cur.fetchall():
+            existing.add(k)
+
+    to_write = []
+    now = time.time()
+    for k, v in data.items():
+        if k in existing:
+            continue
+        try:
+            blob = pickle.dumps(v, protocol=pickle.HIGHEST_PROTOCOL)
+            to_write.append((k, blob, now))
+        except Exception:
+            continue
+
+    if not to_write:
+        return
+
+    with _SQL_LOCK:
+        cur = _SQL_CONN.cursor()
+        cur.executemany("INSERT INTO kv_cache(key, value, updated_at) VALUES(?,?,?);", to_write)
+        _SQL_CONN.commit()
+
+
+def scan(prefix="", limit=None, since=None):
+    """
+    Yields (key, value, updated_at) for stored rows whose key starts with
+    `prefix` (and, with `since`, that were written after that time).
+    """
+    _sql_connect()
+    sql = "SELECT key, value, updated_at FROM kv_cache"
+    where, params = [], []
+    if prefix:
+        where.append("key >= ? AND key < ?")
+        params += [prefix, prefix + "\uffff"]
+    if since:
+        where.append("updated_at > ?")
+        params.append(float(since))
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if limit:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    with _SQL_LOCK:
+        rows = _SQL_CONN.execute(sql + ";", params).fetchall()
+
+    for key, blob, updated_at in rows:
+        try:
+            val = pickle.loads(blob)
+        except Exception:
+            continue
+        yield key, val, updated_at
+
+
+def stats():
+    """Row counts and sizes per cache family, plus the database file size."""
+    _sql_connect()
+    with _SQL_LOCK:
+        rows = _SQL_CONN.execute("SELECT key, length(value), updated_at FROM kv_cache;").fetchall()
+
+    families = {}
+    for key, size, updated_at in rows:
+        fam = families.setdefault(run_metrics.cache_family(key), {"rows": 0, "bytes": 0, "newest": 0.0})
+        fam["rows"] += 1
+        fam["bytes"] += size or 0
+        fam["newest"] = max(fam["newest"], updated_at or 0.0)
+
+    db_path = config.resolve_path(config.DB_FILE)
+    file_bytes = sum(os.path.getsize(db_path + s) for s in ("", "-wal") if os.path.exists(db_path + s))
+    return {"path": db_path, "rows": len(rows), "file_bytes": file_bytes, "families": families}
+
+
+def export(out, prefix=""):
+    """Writes matching rows to the file object `out` as JSON lines. Returns the row count."""
+    n = 0
+    for key, val, updated_at in scan(prefix):
+        out.write(json.dumps({"key": key, "value": val, "updated_at": updated_at}, ensure_ascii=False, default=str))
+        out.write("\n")
+        n += 1
+    return n
@@ -0,0 +1,195 @@
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+import run_metrics
+
+_LOCAL = threading.local()
+_WRITE_LOCK = threading.Lock()
+_RUN_PATH = None
+_RUN_FILE = None
+
+
+def enabled():
+    return _RUN_PATH is not None
+
+
+def run_path():
+    return _RUN_PATH
+
+
+def start_run(path=None):
+    """Opens this run's trace file (one JSON line per artist). Returns its path."""
+    global _RUN_PATH, _RUN_FILE
+    end_run()
+    if path is None:
+        if not config.TRACE_DIR:
+            return None
+        trace_dir = config.resolve_path(config.TRACE_DIR)
+        path = os.path.join(trace_dir, f"trace_{time.strftime('%Y%m%d-%H%M%S')}.jsonl")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    _RUN_FILE = open(path, "a", encoding="utf-8")
+    _RUN_PATH = path
+    return path
+
+
+def end_run():
+    global _RUN_PATH, _RUN_FILE
+    with _WRITE_LOCK:
+        if _RUN_FILE is not None:
+            _RUN_FILE.close()
+        _RUN_FILE = None
+        _RUN_PATH = None
+
+
+def new_trace(artist_name, spotify_link):
+    if not enabled():
+        return None
+    return {
+        "artist": artist_name,
+        "link": spotify_link,
+        "t0": time.time(),
+        "steps": [],
+        "http": [],
+        "cache": [],
+        "notes": [],
+    }
+
+
+@contextmanager
+def activate(trace):
+    """Makes `trace` the current thread's trace for the duration of the block."""
+    prev = getattr(_LOCAL, "trace", None)
+    _LOCAL.trace = trace
+    try:
+        yield trace
+    finally:
+        _LOCAL.trace = prev
+
+
+def current():
+    return getattr(_LOCAL, "trace", None)
+
+
+def _step():
+    return run_metrics.current_step()
+
+
+def record_step(step, seconds, resolved=False):
+    tr = current()
+    if tr is not None:
+        tr["steps"].append([step, round(seconds, 4), 1 if resolved else 0])
+
+
+def record_http(upstream, url, status, latency, wait):
+    tr = current()
+    if tr is not None:
+        tr["http"].append([_step(), upstream, url[:300], status, round(latency, 4), round(wait, 4)])
+
+
+def record_cache(key, hit):
+    tr = current()
+    if tr is not None:
+        tr["cache"].append([_step(), key[:200], 1 if hit else 0])
+
+
+def note(kind, **data):
+    tr = current()
+    if tr is not None:
+        tr["notes"].append(dict(data, kind=kind, step=_step()))
+
+
+def finish(trace, result):
+    if trace is None or not enabled():
+        return
+    trace["total_s"] = round(time.time() - trace.pop("t0"), 4)
+    trace["method"] = (result or {}).get("method")
+    trace["mbid"] = (result or {}).get("mbid")
+    trace["country"] = (result or {}).get("country")
+    line = json.dumps(trace, ensure_ascii=False, separators=(",", ":"))
+    with _WRITE_LOCK:
+        if _RUN_FILE is not None:
+            _RUN_FILE.write(line + "\n")
+            _RUN_FILE.flush()
+
+
+def load(paths):
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def summarize(paths, top=15):
+    traces = list(load(paths))
+    if not traces:
+        print("No traces found.")
+        return
+
+    def _cost(t):
+        http = t.get("http", [])
+        return {
+            "total_s": t.get("total_s", 0.0),
+            "requests": len(http),
+            "wait_s": sum(h[5] for h in http),
+            "latency_s": sum(h[4] for h in http),
+            "misses": sum(1 for c in t.get("cache", []) if not c[2]),
+        }
+
+    print(f"{len(traces)} artists traced\n")
+    print(f"Most expensive artists (top {top}):")
+    print(f"  {'total_s':>8} {'reqs':>5} {'wait_s':>7} {'http_s':>7} {'miss':>5}  method / artist")
+    ranked = sorted(traces, key=lambda t: t.get("total_s", 0.0), reverse=True)[:top]
+    for t in ranked:
+        c = _cost(t)
+        print(
+            f"  {c['total_s']:>8.1f} {c['requests']:>5} {c['wait_s']:>7.1f} {c['latency_s']:>7.1f} "
+            f"{c['misses']:>5}  {t.get('method')} / {t.get('artist')}"
+        )
+
+    patterns = {}
+    for t in traces:
+        key = ">".join(s[0] for s in t.get("steps", [])) or "-"
+        p = patterns.setdefault(key, {"count": 0, "total_s": 0.0, "requests": 0})
+        c = _cost(t)
+        p["count"] += 1
+        p["total_s"] += c["total_s"]
+        p["requests"] += c["requests"]
+
+    print("\nMost expensive step patterns:")
+    print(f"  {'count':>6} {'total_s':>9} {'avg_s':>7} {'reqs/artist':>11}  pattern")
+    for key, p in sorted(patterns.items(), key=lambda kv: kv[1]["total_s"], reverse=True)[:top]:
+        print(
+            f"  {p['count']:>6} {p['total_s']:>9.1f} {p['total_s'] / p['count']:>7.1f} "
+            f"{p['requests'] / p['count']:>11.1f}  {key}"
+        )
+
+    per_step = {}
+    for t in traces:
+        for h in t.get("http", []):
+            s = per_step.setdefault(h[0] or "-", {"requests": 0, "wait_s": 0.0, "latency_s": 0.0})
+            s["requests"] += 1
+            s["wait_s"] += h[5]
+            s["latency_s"] += h[4]
+
+    print("\nHTTP cost by step:")
+    for step, s in sorted(per_step.items(), key=lambda kv: kv[1]["wait_s"] + kv[1]["latency_s"], reverse=True):
+        print(f"  {step:<8} requests={s['requests']:<6} wait={s['wait_s']:.1f}s latency={s['latency_s']:.1f}s")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args:
+        print("Usage: python tracing.py TRACE.jsonl [TRACE.jsonl ...]")
+        raise SystemExit(2)
+    files = []
+    for a in args:
+        files.extend(sorted(glob.glob(a)) or [a])
+    summarize(files)
@@ -0,0 +1,148 @@
+import asyncio
+import importlib
+import inspect
+import threading
+
+import config
+
+# All translation goes through one long-lived event loop on a daemon thread.
+# Callers in any thread submit (text, src, dest) requests and block on the
+# result; identical requests already in flight share one backend call, and at
+# most TRANSLATE_CONCURRENCY calls run at once.
+
+
+class TranslatorBackend:
+    """
+    A translation service. It is created on the worker's loop thread and
+    only ever awaited there, so it may hold loop-bound clients.
+    """
+
+    async def translate(self, text, src, dest):
+        """The translated text, or None."""
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+
+class GoogleTransBackend(TranslatorBackend):
+    def __init__(self):
+        from googletrans import Translator
+
+        self._translator = Translator()
+        # googletrans 4.0.0rc1 translates synchronously, later 4.0 releases
+        # return a coroutine.
+        self._async = inspect.iscoroutinefunction(self._translator.translate)
+
+    async def translate(self, text, src, dest):
+        if self._async:
+            result = await self._translator.translate(text, src=src, dest=dest)
+        else:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(None, lambda: self._translator.translate(text, src=src, dest=dest))
+        return getattr(result, "text", None)
+
+
+def _load_backend():
+    if not config.TRANSLATE_BACKEND:
+        return GoogleTransBackend()
+    module, _, attr = config.TRANSLATE_BACKEND.partition(":")
+    return getattr(importlib.import_module(module), attr)()
+
+
+class TranslationWorker:
+    def __init__(self, backend_factory=_load_backend, concurrency=4):
+        self._factory = backend_factory
+        self._concurrency = max(1, int(concurrency))
+        self._loop = asyncio.new_event_loop()
+        self._inflight = {}
+        self._error = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="translator", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            self._thread.join()
+            raise self._error
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._backend = self._factory()
+            self._sem = asyncio.Semaphore(self._concurrency)
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            self._loop.close()
+            return
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            try:
+                self._loop.run_until_complete(self._backend.aclose())
+            except Exception:
+                pass
+            self._loop.close()
+
+    async def _translate(self, key):
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._loop.create_task(self._call(*key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _call(self, text, src, dest):
+        async with self._sem:
+            try:
+                return await self._backend.translate(text, src, dest)
+            except Exception:
+                return None
+
+    def submit(self, text, src, dest):
+        """concurrent.futures.Future for one translation."""
+        return asyncio.run_coroutine_threadsafe(self._translate((text, src, dest)), self._loop)
+
+    def translate(self, text, src, dest, timeout=None):
+        return self.submit(text, src, dest).result(timeout)
+
+    def translate_many(self, requests, timeout=None):
+        """Translations for [(text, src, dest), ...], all submitted before waiting on any."""
+        futures = [self.submit(*r) for r in requests]
+        out = []
+        for f in futures:
+            try:
+                out.append(f.result(timeout))
+            except Exception:
+                out.append(None)
+        return out
+
+    def shutdown(self):
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+_WORKER = None
+_WORKER_LOCK = threading.Lock()
+
+
+def get_worker():
+    """Shared TranslationWorker, or None when the backend cannot be created."""
+    global _WORKER
+    with _WORKER_LOCK:
+        if _WORKER is None:
+            try:
+                _WORKER = TranslationWorker(_load_backend, config.TRANSLATE_CONCURRENCY)
+            except Exception:
+                _WORKER = False
+        return _WORKER or None
+
+
+def shutdown_worker():
+    global _WORKER
+    with _WORKER_LOCK:
+        worker, _WORKER = _WORKER, None
+    if worker:
+        worker.shutdown()